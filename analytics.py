@@ -0,0 +1,182 @@
+import datetime
+import pandas as pd
+
+# Dimensions the dashboard reports on, mapped to the booking column they group by
+DIMENSIONS = {
+    'travel_day': 'Travel Date',
+    'booking_day': 'Booking Date',
+    'product': 'Product',
+    'country': 'Country',
+}
+
+# Metrics kept for every aggregate key: bookings, adults, GYG price and net price
+METRICS = ['Bookings', 'Adults', 'GYG Price', 'Net Price']
+
+class BookingAnalytics:
+    def __init__(self, db_connection):
+        self.db_connection = db_connection
+
+        # Materialized aggregates, one dict per dimension: key -> [bookings, adults, gyg price, net price]
+        self.aggregates = {dimension: {} for dimension in DIMENSIONS}
+
+        # Keys changed since the last save, so only those rows are written back to SQLite
+        self.dirty = {dimension: set() for dimension in DIMENSIONS}
+        self.cleared = False
+
+        self.create_tables_if_not_exist()
+
+    def create_tables_if_not_exist(self):
+        # One aggregate table per dimension, keyed by the grouped value
+        for dimension in DIMENSIONS:
+            self.db_connection.execute(f'''
+            CREATE TABLE IF NOT EXISTS analytics_{dimension} (
+                Key TEXT PRIMARY KEY,
+                Bookings INTEGER,
+                Adults REAL,
+                GYG_Price REAL,
+                Net_Price REAL
+            );
+            ''')
+
+        # Bookings version the stored aggregates were computed for
+        self.db_connection.execute('CREATE TABLE IF NOT EXISTS analytics_meta (Version INTEGER NOT NULL);')
+        self.db_connection.commit()
+
+    #=========================================INCREMENTAL MAINTENANCE=============================================#
+
+    def reset(self):
+        # Drop every aggregate, the tables are cleared on the next save
+        self.aggregates = {dimension: {} for dimension in DIMENSIONS}
+        self.dirty = {dimension: set() for dimension in DIMENSIONS}
+        self.cleared = True
+
+    def rebuild(self, frame):
+        # Full recomputation, only used when the persisted aggregates are missing or stale
+        self.reset()
+        self.add_rows(frame)
+
+    def add_rows(self, frame):
+        # Fold newly imported rows into the aggregates
+        self._apply(frame, 1)
+
+    def remove_rows(self, frame):
+        # Take deleted rows back out of the aggregates
+        self._apply(frame, -1)
+
+    def update_rows(self, old_frame, new_frame):
+        # An edit is the old version removed and the new version added
+        self._apply(old_frame, -1)
+        self._apply(new_frame, 1)
+
+    def _apply(self, frame, sign):
+        if frame is None or frame.empty:
+            return
+
+        # Only the changed rows are grouped, never the whole booking history
+        metrics = pd.DataFrame({
+            'Bookings': 1,
+            'Adults': self._numeric(frame, 'Adult'),
+            'GYG Price': self._numeric(frame, 'GYG Price'),
+            'Net Price': self._numeric(frame, 'Net Price'),
+        }, index=frame.index)
+
+        for dimension in DIMENSIONS:
+            grouped = metrics.groupby(self._keys(frame, dimension), sort=False).sum()
+            aggregate = self.aggregates[dimension]
+
+            for key, bookings, adults, gyg_price, net_price in grouped.itertuples(name=None):
+                values = aggregate.setdefault(key, [0, 0.0, 0.0, 0.0])
+                values[0] += sign * int(bookings)
+                values[1] += sign * adults
+                values[2] += sign * gyg_price
+                values[3] += sign * net_price
+
+                # Keys without any bookings left are removed entirely
+                if values[0] <= 0:
+                    del aggregate[key]
+                self.dirty[dimension].add(key)
+
+    def _numeric(self, frame, column):
+        if column not in frame.columns:
+            return pd.Series(0.0, index=frame.index)
+        return pd.to_numeric(frame[column], errors='coerce').fillna(0.0)
+
+    def _keys(self, frame, dimension):
+        column = DIMENSIONS[dimension]
+        if column not in frame.columns:
+            return pd.Series('Unknown', index=frame.index)
+
+        keys = frame[column].astype(str)
+        if dimension == 'booking_day':
+            # Booking dates carry a time, the day is the 'dd/mm/yyyy' part
+            keys = keys.str[:10]
+        return keys.where(frame[column].notna(), 'Unknown')
+
+    #===========================================PERSISTENCE=======================================================#
+
+    def save(self, version):
+        # Write only the keys that changed since the last save, the caller commits together with the bookings of that version
+        for dimension in DIMENSIONS:
+            table = f'analytics_{dimension}'
+            if self.cleared:
+                self.db_connection.execute(f'DELETE FROM {table};')
+
+            aggregate = self.aggregates[dimension]
+            dirty = self.dirty[dimension]
+            removed = [(key,) for key in dirty if key not in aggregate]
+            changed = [(key, *aggregate[key]) for key in dirty if key in aggregate]
+
+            self.db_connection.executemany(f'DELETE FROM {table} WHERE Key=?;', removed)
+            self.db_connection.executemany(f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?);', changed)
+            dirty.clear()
+
+        self.db_connection.execute('DELETE FROM analytics_meta;')
+        self.db_connection.execute('INSERT INTO analytics_meta (Version) VALUES (?);', (version,))
+        self.cleared = False
+
+    def load(self, version, expected_rows):
+        # Load the persisted aggregates, returns False when they don't match the bookings they describe
+        try:
+            row = self.db_connection.execute('SELECT Version FROM analytics_meta;').fetchone()
+            if row is None or row[0] != version:
+                return False
+            for dimension in DIMENSIONS:
+                rows = self.db_connection.execute(f'SELECT Key, Bookings, Adults, GYG_Price, Net_Price FROM analytics_{dimension};')
+                self.aggregates[dimension] = {row[0]: list(row[1:]) for row in rows}
+        except Exception as e:
+            print(f"Error loading analytics: {e}")
+            return False
+
+        self.dirty = {dimension: set() for dimension in DIMENSIONS}
+        self.cleared = False
+        return self.summary()['Bookings'] == expected_rows
+
+    #=============================================REPORTING=======================================================#
+
+    def summary(self):
+        # Overall totals, every booking appears exactly once in each dimension
+        totals = [0, 0.0, 0.0, 0.0]
+        for values in self.aggregates['product'].values():
+            for i, value in enumerate(values):
+                totals[i] += value
+
+        summary = dict(zip(METRICS, totals))
+        summary['Margin'] = summary['GYG Price'] - summary['Net Price']
+        return summary
+
+    def table(self, dimension):
+        # Rows of (key, bookings, adults, gyg price, net price, margin) ready for display
+        rows = [(key, *values, values[2] - values[3]) for key, values in self.aggregates[dimension].items()]
+
+        if dimension in ('travel_day', 'booking_day'):
+            rows.sort(key=lambda row: self._date_sort_key(row[0]))
+        else:
+            # Busiest keys first for products and countries
+            rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def _date_sort_key(self, key):
+        try:
+            return (0, datetime.datetime.strptime(key, '%d/%m/%Y'))
+        except ValueError:
+            return (1, datetime.datetime.min)
@@ -0,0 +1,398 @@
+import argparse
+import datetime
+import hashlib
+import hmac
+import json
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import pandas as pd
+
+from archive import BookingArchive
+from fuzzy_search import NameIndex
+from mailer import schedule_mail
+from search import filter_bookings
+
+# Port of the local API, override with BOOKING_API_PORT
+DEFAULT_PORT = int(os.environ.get('BOOKING_API_PORT', 8765))
+
+# Token required on every request that changes something, from BOOKING_API_TOKEN or else a generated token file
+API_TOKEN_FILE = 'api_token.txt'
+
+# Largest page a listing request may ask for, and how many rows go into each streamed chunk
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+class ConnectionPool:
+    def __init__(self, db_path, size=4):
+        # Connections are shared between the request threads, one request uses one connection at a time
+        self.connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL;')
+            conn.execute('PRAGMA busy_timeout=5000;')
+            self.connections.put(conn)
+        self.size = size
+
+    @contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+    @contextmanager
+    def snapshot(self):
+        # Read transaction, so the version and the rows come from the same saved state
+        with self.connection() as conn:
+            conn.execute('BEGIN;')
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.execute('COMMIT;')
+
+    def close(self):
+        for _ in range(self.size):
+            self.connections.get().close()
+
+class BookingStore:
+    def __init__(self, pool, archive=None, cache_size=128):
+        self.pool = pool
+        self.archive = archive
+        self.lock = threading.Lock()
+
+        # Bookings and name index of the last seen version, shared by every search request
+        self.frame = None
+        self.frame_version = None
+        self.name_index = None
+
+        # Encoded list responses keyed by (version, request)
+        self.responses = OrderedDict()
+        self.cache_size = cache_size
+
+        with self.pool.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS store_meta (Version INTEGER NOT NULL);')
+            conn.execute('INSERT INTO store_meta (Version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM store_meta);')
+
+    def version(self, conn=None):
+        # Bumped by the booking system every time it saves the bookings
+        if conn is not None:
+            row = conn.execute('SELECT Version FROM store_meta;').fetchone()
+            return row[0] if row else 0
+        with self.pool.connection() as conn:
+            return self.version(conn)
+
+    def bookings(self):
+        # All saved bookings as a DataFrame, only read again once the version changes
+        with self.pool.snapshot() as conn:
+            version = self.version(conn)
+            with self.lock:
+                if self.frame_version != version:
+                    try:
+                        frame = pd.read_sql_query('SELECT * FROM bookings;', conn)
+                    except pd.io.sql.DatabaseError:
+                        frame = pd.DataFrame()
+                    self.frame = frame.rename(columns=self._column_name)
+                    self.frame_version = version
+                    self.name_index = None
+                return version, self.frame
+
+    def search(self, criteria, value, date_value, include_archive=False):
+        # Same criteria as the search dialog of the booking system
+        version, frame = self.bookings()
+        name_index = None
+        if criteria == 'Customer Name (Fuzzy)':
+            with self.lock:
+                if self.name_index is None and 'Name' in frame.columns:
+                    self.name_index = NameIndex()
+                    self.name_index.add_names(frame['Name'])
+                name_index = self.name_index or NameIndex()
+
+        result = filter_bookings(frame, criteria, value, date_value, name_index) if not frame.empty else frame
+        if include_archive and self.archive is not None:
+            archived = self.archive.search(criteria, value, date_value)
+            if not archived.empty:
+                result = pd.concat([result, archived.rename(columns=self._column_name)], ignore_index=True)
+        return version, result
+
+    def page(self, page, page_size):
+        # One page of bookings in saved order, with the total count
+        with self.pool.snapshot() as conn:
+            version = self.version(conn)
+            try:
+                total = conn.execute('SELECT COUNT(*) FROM bookings;').fetchone()[0]
+                frame = pd.read_sql_query('SELECT * FROM bookings LIMIT ? OFFSET ?;', conn, params=(page_size, (page - 1) * page_size))
+            except (sqlite3.OperationalError, pd.io.sql.DatabaseError):
+                total, frame = 0, pd.DataFrame()
+        return version, total, frame.rename(columns=self._column_name)
+
+    def lookup(self, booking_ref):
+        # Single booking as a dict, from the database or else the archive
+        with self.pool.snapshot() as conn:
+            version = self.version(conn)
+            for column in ('Booking Ref', 'Booking_Ref'):
+                try:
+                    frame = pd.read_sql_query(f'SELECT * FROM bookings WHERE [{column}] = ? LIMIT 1;', conn, params=(booking_ref,))
+                except pd.io.sql.DatabaseError:
+                    continue
+                if not frame.empty:
+                    return version, records(frame.rename(columns=self._column_name))[0]
+
+        if self.archive is not None:
+            record = self.archive.lookup(booking_ref)
+            if record is not None:
+                return version, records(pd.DataFrame([record]).rename(columns=self._column_name))[0]
+        return version, None
+
+    def cached_response(self, key, build):
+        # Encoded response for key at the current version, built on a miss
+        version = self.version()
+        with self.lock:
+            if (version, key) in self.responses:
+                self.responses.move_to_end((version, key))
+                return self.responses[(version, key)]
+
+        response = build()
+        with self.lock:
+            self.responses[(version, key)] = response
+            while len(self.responses) > self.cache_size:
+                self.responses.popitem(last=False)
+        return response
+
+    def _column_name(self, column):
+        # The bookings table has used both 'Booking_Ref' and 'Booking Ref' style column names
+        return column.replace('_', ' ')
+
+def records(frame):
+    # JSON friendly rows, NaN becomes null
+    frame = frame.astype(object).where(frame.notna(), None)
+    columns = list(frame.columns)
+    return [dict(zip(columns, row)) for row in frame.itertuples(index=False, name=None)]
+
+def load_api_token(path=API_TOKEN_FILE):
+    # Shared secret for mutating routes, generated once and only readable by the current user
+    token = os.environ.get('BOOKING_API_TOKEN')
+    if token:
+        return token
+    if not os.path.exists(path):
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as file:
+            file.write(secrets.token_urlsafe(32))
+    with open(path) as file:
+        return file.read().strip()
+
+def make_etag(version, key):
+    return '"' + hashlib.sha1(f'{version}|{key}'.encode()).hexdigest()[:20] + '"'
+
+class BookingAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    #==================================================ROUTING====================================================#
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+
+        try:
+            if parts == ['bookings']:
+                self.list_bookings(params)
+            elif parts == ['bookings', 'search']:
+                self.search_bookings(params)
+            elif len(parts) == 2 and parts[0] == 'bookings':
+                self.get_booking(parts[1])
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': f'An error occurred: {e}'})
+
+    def do_POST(self):
+        parts = [part for part in urlparse(self.path).path.strip('/').split('/') if part]
+
+        try:
+            # Rejected bodies are never read, so the connection can't be reused after them
+            if not self.authorized():
+                self.close_connection = True
+                self.send_json(401, {'error': 'A valid Authorization: Bearer token is required'})
+            elif self.headers.get('Content-Type', '').split(';')[0].strip().lower() != 'application/json':
+                self.close_connection = True
+                self.send_json(415, {'error': 'Content-Type must be application/json'})
+            elif parts == ['mails']:
+                self.schedule_mail()
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': f'An error occurred: {e}'})
+
+    #=================================================ENDPOINTS===================================================#
+
+    def list_bookings(self, params):
+        # GET /bookings?page=1&page_size=100
+        page = int(params.get('page', 1))
+        page_size = min(int(params.get('page_size', 100)), MAX_PAGE_SIZE)
+        if page < 1 or page_size < 1:
+            raise ValueError("page and page_size must be positive")
+
+        store = self.server.store
+        key = f'list|{page}|{page_size}'
+        if self.not_modified(make_etag(store.version(), key)):
+            return
+
+        def build():
+            version, total, frame = store.page(page, page_size)
+            payload = {'page': page, 'page_size': page_size, 'total': total, 'bookings': records(frame)}
+            return make_etag(version, key), json.dumps(payload, default=str).encode()
+
+        etag, body = store.cached_response(key, build)
+        self.send_body(200, body, etag)
+
+    def search_bookings(self, params):
+        # GET /bookings/search?criteria=Customer Name&value=ali&date=01/02/2024&include_archive=1
+        criteria = params.get('criteria', 'Booking Ref')
+        include_archive = params.get('include_archive', '0').lower() in ('1', 'true', 'yes')
+
+        store = self.server.store
+        key = '|'.join(['search', criteria, params.get('value', ''), params.get('date', ''), str(include_archive)])
+        if self.not_modified(make_etag(store.version(), key)):
+            return
+
+        version, result = store.search(criteria, params.get('value', ''), params.get('date', ''), include_archive)
+        self.stream_json(result, make_etag(version, key))
+
+    def get_booking(self, booking_ref):
+        # GET /bookings/<booking ref>
+        version, record = self.server.store.lookup(booking_ref)
+        if record is None:
+            self.send_json(404, {'error': f'No booking found for {booking_ref}'})
+        else:
+            self.send_json(200, record, make_etag(version, f'booking|{booking_ref}'))
+
+    def schedule_mail(self):
+        # POST /mails {"booking_ref": ..., "subject": ..., "body": ..., "send_at": "2024-03-01T09:00"}
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object")
+
+        # Mails only go to the customer of a booking and never carry files from this machine
+        if 'email' in request or 'attachments' in request:
+            raise ValueError("email and attachments aren't accepted, the recipient comes from booking_ref")
+        booking_ref = request.get('booking_ref')
+        if not booking_ref:
+            raise ValueError("booking_ref is required")
+        _, record = self.server.store.lookup(booking_ref)
+        if record is None:
+            raise ValueError(f"No booking found for {booking_ref}")
+        email = record.get('Email')
+        if not email:
+            raise ValueError(f"Booking {booking_ref} has no email address")
+        if not request.get('subject'):
+            raise ValueError("subject is required")
+
+        send_at = request.get('send_at')
+        send_datetime = datetime.datetime.fromisoformat(send_at) if send_at else datetime.datetime.now()
+
+        schedule_mail(send_datetime, email, request['subject'], request.get('body', ''))
+        self.send_json(202, {'booking_ref': booking_ref, 'email': email, 'scheduled_for': send_datetime.isoformat()})
+
+    #=================================================RESPONSES===================================================#
+
+    def authorized(self):
+        # Browsers can't attach this header cross-origin without a preflight, which the server never answers
+        scheme, _, token = self.headers.get('Authorization', '').partition(' ')
+        return bool(self.server.token) and scheme == 'Bearer' and hmac.compare_digest(token.strip().encode(), self.server.token.encode())
+
+    def not_modified(self, etag):
+        # Answer 304 when the client already holds the response for this version
+        if self.headers.get('If-None-Match') != etag:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return True
+
+    def send_json(self, status, payload, etag=None):
+        self.send_body(status, json.dumps(payload, default=str).encode(), etag)
+
+    def send_body(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_json(self, frame, etag):
+        # Write {"total": n, "bookings": [...]} in chunks, large results are never encoded in one piece
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+        self.write_chunk(f'{{"total": {len(frame)}, "bookings": ['.encode())
+        for start in range(0, len(frame), STREAM_BATCH_SIZE):
+            batch = ','.join(json.dumps(record, default=str) for record in records(frame.iloc[start:start + STREAM_BATCH_SIZE]))
+            self.write_chunk(((',' if start else '') + batch).encode())
+        self.write_chunk(b']}')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def write_chunk(self, data):
+        self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+
+#===================================================SERVER========================================================#
+
+def create_server(db_path='booking_data.db', host='127.0.0.1', port=DEFAULT_PORT, archive=None, pool_size=4, token=None):
+    server = ThreadingHTTPServer((host, port), BookingAPIHandler)
+    server.daemon_threads = True
+    server.token = token or load_api_token()
+    server.pool = ConnectionPool(db_path, pool_size)
+    server.store = BookingStore(server.pool, archive)
+    return server
+
+def start_server_in_background(db_path='booking_data.db', host='127.0.0.1', port=DEFAULT_PORT, archive=None):
+    # Serve next to the booking system, stop with stop_server
+    server = create_server(db_path, host, port, archive)
+    threading.Thread(target=server.serve_forever, name='booking-api', daemon=True).start()
+    return server
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+    server.pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON API over the booking database")
+    parser.add_argument('--db', default='booking_data.db', help="path of the booking database")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--archive-dir', default='archive', help="directory of the archived booking partitions")
+    args = parser.parse_args()
+
+    server = create_server(args.db, args.host, args.port, BookingArchive(args.archive_dir))
+    print(f"Booking API listening on http://{args.host}:{args.port}")
+    print(f"POST requests need 'Authorization: Bearer <token>', the token is BOOKING_API_TOKEN or the contents of {API_TOKEN_FILE}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import datetime
+import glob
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+# Bookings that travelled more than this many days ago are archived, override with BOOKING_ARCHIVE_DAYS
+DEFAULT_HORIZON_DAYS = int(os.environ.get('BOOKING_ARCHIVE_DAYS', 90))
+
+class BookingArchive:
+    def __init__(self, directory='archive', horizon_days=DEFAULT_HORIZON_DAYS, max_workers=8):
+        self.directory = directory
+        self.horizon_days = horizon_days
+        self.max_workers = max_workers
+
+    #=================================================PARTITIONS==================================================#
+
+    def partition_path(self, year, month):
+        # One SQLite file per travel month, e.g. archive/bookings_2024_03.db
+        return os.path.join(self.directory, f'bookings_{year:04d}_{month:02d}.db')
+
+    def partitions(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'bookings_*.db')))
+
+    def row_count(self):
+        # Total archived bookings over all partitions
+        return sum(self._query(path, 'SELECT COUNT(*) FROM bookings;').iloc[0, 0] for path in self.partitions())
+
+    #==================================================ARCHIVAL===================================================#
+
+    def archive(self, frame, horizon_days=None):
+        # Move bookings older than the horizon into their monthly partition, returns (kept, archived)
+        if horizon_days is None:
+            horizon_days = self.horizon_days
+        if frame.empty or 'Travel Date' not in frame.columns:
+            return frame, frame.iloc[0:0]
+
+        old = self._past_horizon(frame, horizon_days)
+        if not old.any():
+            return frame, frame.iloc[0:0]
+
+        os.makedirs(self.directory, exist_ok=True)
+        archived = frame[old]
+        written = []
+        try:
+            for (year, month), partition in self._by_month(archived):
+                path = self.partition_path(year, month)
+                created = not os.path.exists(path)
+                conn = sqlite3.connect(path)
+                try:
+                    self._write_partition(conn, partition)
+                except Exception:
+                    # A new partition without its table would break every later query
+                    conn.close()
+                    if created:
+                        os.remove(path)
+                    raise
+                finally:
+                    conn.close()
+                written.append(partition)
+        except Exception:
+            # Months written before the failure are taken back out, the bookings stay in the working set only
+            if written:
+                self.unarchive(pd.concat(written))
+            raise
+
+        return frame[~old], archived
+
+    def unarchive(self, archived):
+        # Remove bookings written by archive() from their partitions, for when they have to stay in the working set after all
+        for (year, month), partition in self._by_month(archived):
+            path = self.partition_path(year, month)
+            if not os.path.exists(path):
+                continue
+            conn = sqlite3.connect(path)
+            try:
+                with conn:
+                    conn.executemany('DELETE FROM bookings WHERE [Booking Ref] = ?;', [(ref,) for ref in partition['Booking Ref'].dropna().unique()])
+            finally:
+                conn.close()
+
+    def _write_partition(self, conn, partition):
+        # Archived bookings replace earlier copies with the same Booking Ref, so archiving twice never duplicates them
+        conn.execute('BEGIN;')
+        try:
+            conn.execute(pd.io.sql.get_schema(partition, 'bookings', con=conn).replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_booking_ref ON bookings ([Booking Ref]);')
+            conn.executemany('DELETE FROM bookings WHERE [Booking Ref] = ?;', [(ref,) for ref in partition['Booking Ref'].dropna().unique()])
+
+            columns = ', '.join(f'"{col}"' for col in partition.columns)
+            placeholders = ', '.join('?' for _ in partition.columns)
+            rows = partition.astype(object).where(partition.notna(), None).itertuples(index=False, name=None)
+            conn.executemany(f'INSERT INTO bookings ({columns}) VALUES ({placeholders});', rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def archived_refs(self, frame, horizon_days=None, batch_size=500):
+        # Booking refs of frame already in the archive, only the partitions for the travel months of its rows past the horizon are read
+        if horizon_days is None:
+            horizon_days = self.horizon_days
+        if frame.empty or 'Travel Date' not in frame.columns:
+            return set()
+
+        refs = set()
+        for (year, month), partition in self._by_month(frame[self._past_horizon(frame, horizon_days)]):
+            path = self.partition_path(year, month)
+            if not os.path.exists(path):
+                continue
+
+            # Batched to stay below SQLite's limit on query parameters
+            month_refs = partition['Booking Ref'].dropna().unique().tolist()
+            for start in range(0, len(month_refs), batch_size):
+                batch = month_refs[start:start + batch_size]
+                placeholders = ', '.join('?' for _ in batch)
+                result = self._query(path, f'SELECT DISTINCT [Booking Ref] FROM bookings WHERE [Booking Ref] IN ({placeholders});', batch)
+                refs.update(result['Booking Ref'].dropna())
+        return refs
+
+    def _past_horizon(self, frame, horizon_days):
+        # Rows that travelled more than horizon_days ago
+        travel_dates = pd.to_datetime(frame['Travel Date'], format='%d/%m/%Y', errors='coerce')
+        return travel_dates < pd.Timestamp(datetime.date.today() - datetime.timedelta(days=horizon_days))
+
+    def _by_month(self, frame):
+        # ((year, month), rows) per travel month, rows without a valid travel date are left out
+        travel_dates = pd.to_datetime(frame['Travel Date'], format='%d/%m/%Y', errors='coerce')
+        for (year, month), rows in frame.groupby([travel_dates.dt.year, travel_dates.dt.month]):
+            yield (int(year), int(month)), rows
+
+    #===================================================SEARCH====================================================#
+
+    def search(self, criteria, value, date_value):
+        # Same criteria as the search dialog, every partition is queried in parallel
+        partitions = self.partitions()
+        if criteria == 'Booking Ref':
+            query, params = 'SELECT * FROM bookings WHERE [Booking Ref] LIKE ?;', (f'%{value}%',)
+        elif criteria in ('Customer Name', 'Customer Name (Fuzzy)'):
+            # The archive has no name index, fuzzy search falls back to a substring match there
+            query, params = 'SELECT * FROM bookings WHERE Name LIKE ?;', (f'%{value}%',)
+        elif criteria == 'No of Adults':
+            query, params = 'SELECT * FROM bookings WHERE Adult = ?;', (int(value),)
+        elif criteria == 'Travel Date':
+            # Only the partition of that travel month can hold matches
+            query, params = 'SELECT * FROM bookings WHERE [Travel Date] = ?;', (date_value,)
+            try:
+                travel_date = datetime.datetime.strptime(date_value, '%d/%m/%Y')
+            except ValueError:
+                return pd.DataFrame()
+            partitions = [path for path in partitions if path == self.partition_path(travel_date.year, travel_date.month)]
+        else:
+            return pd.DataFrame()
+
+        return self._query_partitions(partitions, query, params)
+
+    def lookup(self, booking_ref, occurrence=0):
+        # Archived record for a booking ref as a dict, occurrence picks between archived rows sharing the ref, or None
+        result = self._query_partitions(self.partitions(), 'SELECT * FROM bookings WHERE [Booking Ref] = ? ORDER BY rowid;', (booking_ref,))
+        if occurrence >= len(result):
+            return None
+        return result.iloc[occurrence].to_dict()
+
+    def load_all(self):
+        # Every archived booking, only needed when the dashboard aggregates have to be rebuilt
+        return self._query_partitions(self.partitions(), 'SELECT * FROM bookings;')
+
+    def _query_partitions(self, partitions, query, params=()):
+        if not partitions:
+            return pd.DataFrame()
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(partitions))) as executor:
+            results = list(executor.map(lambda path: self._query(path, query, params), partitions))
+
+        results = [result for result in results if not result.empty]
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(results, ignore_index=True)
+
+    def _query(self, path, query, params=()):
+        # Each thread uses its own read-only connection
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
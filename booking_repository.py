@@ -0,0 +1,67 @@
+from collections import OrderedDict
+import pandas as pd
+
+class BookingRepository:
+    def __init__(self, cache_size=1024, archive=None):
+        self.cache_size = cache_size
+
+        # Archived bookings are looked up in the archive partitions when they aren't loaded
+        self.archive = archive
+
+        # Booking Ref -> records of every booking currently loaded with that ref, in booking order
+        # The loaded bookings are authoritative, the database only catches up with an import on the next save
+        self.records = {}
+
+        # Bounded LRU of archive lookups, the loaded bookings are always answered from records
+        self.cache = OrderedDict()
+
+    def warm(self, frame):
+        # Build the in-memory map from the loaded bookings, repeated refs keep every row in order
+        self.records = {}
+        if frame is None or frame.empty:
+            return
+
+        frame = frame.rename(columns=self._column_name)
+        if 'Booking Ref' not in frame.columns:
+            return
+
+        frame = frame.astype(object).where(frame.notna(), "")
+        for record in frame.to_dict('records'):
+            self.records.setdefault(str(record['Booking Ref']).strip(), []).append(record)
+
+    def invalidate(self):
+        # Drop everything, called whenever the bookings are imported or saved
+        self.records = {}
+        self.cache.clear()
+
+    def get(self, booking_ref, occurrence=0):
+        # Record for a booking ref as a dict keyed by column name, or None if it doesn't exist
+        # occurrence picks between bookings sharing a ref, counting the loaded ones before the archived ones
+        if booking_ref is None:
+            return None
+        booking_ref = str(booking_ref).strip()
+        if not booking_ref:
+            return None
+
+        records = self.records.get(booking_ref, [])
+        if occurrence < len(records):
+            return records[occurrence]
+        if self.archive is None:
+            return None
+
+        key = (booking_ref, occurrence - len(records))
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        record = self.archive.lookup(*key)
+        if record is not None:
+            record = {self._column_name(column): ("" if pd.isna(value) else value) for column, value in record.items()}
+            self.cache[key] = record
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return record
+
+    def _column_name(self, column):
+        # The bookings table has used both 'Booking_Ref' and 'Booking Ref' style column names
+        return column.replace('_', ' ')
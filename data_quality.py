@@ -0,0 +1,136 @@
+import pandas as pd
+
+# Loose shape of an email address, anything that can't be mailed at all is flagged
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+
+# Booking columns parsed with errors='coerce', mapped to the Excel column they are parsed from
+SOURCE_COLUMNS = {
+    'Booking Date': 'Purchase Date (local time)',
+    'Travel Date': 'Date',
+    'Adult': 'Adult',
+    'GYG Price': 'Price',
+    'Net Price': 'Net Price',
+}
+
+BOOKING_COLUMNS = ['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email', 'Phone No', 'Adult', 'GYG Price', 'Net Price']
+
+QUARANTINE_COLUMNS = ['Count', 'Booking Ref', 'Name', 'Issue', 'Detail']
+
+def source_presence(data):
+    # Which source cells were filled in, so a missing parsed value can be told apart from an unparseable one
+    presence = pd.DataFrame(index=data.index)
+    for column, source in SOURCE_COLUMNS.items():
+        if source in data.columns:
+            presence[column] = data[source].notna() & data[source].astype(object).ne('')
+        else:
+            presence[column] = False
+    return presence
+
+class DataQualityScanner:
+    def __init__(self, db_connection):
+        self.db_connection = db_connection
+        self.issues = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+        self.create_table_if_not_exists()
+
+    def create_table_if_not_exists(self):
+        # Quarantine table holding one row per problem found in the imported bookings
+        self.db_connection.execute('''
+        CREATE TABLE IF NOT EXISTS quarantine (
+            Count INTEGER,
+            [Booking Ref] TEXT,
+            Name TEXT,
+            Issue TEXT,
+            Detail TEXT
+        );
+        ''')
+        self.db_connection.commit()
+
+    #==================================================SCAN=======================================================#
+
+    def scan(self, frame, presence=None):
+        # Check every booking in one vectorized pass, the bookings themselves are left untouched
+        if frame.empty:
+            self.issues = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+            return self.issues
+
+        frame = frame.reindex(columns=list(dict.fromkeys([*BOOKING_COLUMNS, *frame.columns])))
+        if presence is None:
+            presence = pd.DataFrame(False, index=frame.index, columns=list(SOURCE_COLUMNS))
+        found = []
+
+        # Exact duplicates hash identical on every column except the running Count
+        row_hashes = pd.util.hash_pandas_object(frame.drop(columns='Count'), index=False)
+        exact = row_hashes.duplicated(keep='first')
+        first_count = pd.Series(frame['Count'].to_numpy(), index=row_hashes.to_numpy())[~exact.to_numpy()]
+        found.append(self._issues(frame, exact, 'Exact Duplicate', 'Same as Count ' + row_hashes[exact].map(first_count).astype(str)))
+
+        # Repeated booking refs that aren't exact copies of another row
+        refs = frame['Booking Ref']
+        repeated_ref = refs.notna() & refs.duplicated(keep=False) & ~exact
+        found.append(self._issues(frame, repeated_ref, 'Duplicate Booking Ref', 'Booking Ref appears more than once'))
+        found.append(self._issues(frame, refs.isna() | refs.astype(object).eq(''), 'Missing Booking Ref', 'No booking reference'))
+
+        # Near duplicates share the customer, travel date and product under different refs
+        near_key = pd.DataFrame({
+            'Name': frame['Name'].astype('string').str.lower().str.replace(' ', '', regex=False),
+            'Travel Date': frame['Travel Date'],
+            'Product': frame['Product'],
+        })
+        near_hashes = pd.util.hash_pandas_object(near_key, index=False)
+        near = near_hashes.duplicated(keep=False) & ~exact & ~repeated_ref & frame['Name'].notna()
+        found.append(self._issues(frame, near, 'Possible Duplicate', 'Same customer, travel date and product as another booking'))
+
+        # Contact details
+        # An all-empty source column arrives as floats, the string dtype keeps the .str accessor usable
+        email = frame['Email'].astype('string')
+        found.append(self._issues(frame, email.isna(), 'Missing Email', 'No email address'))
+        invalid_email = email.notna() & ~email.str.match(EMAIL_PATTERN).fillna(False).astype(bool)
+        found.append(self._issues(frame, invalid_email, 'Invalid Email', 'Email: ' + email[invalid_email].astype(str)))
+        phone = frame['Phone No']
+        found.append(self._issues(frame, phone.isna() | phone.astype(object).eq(''), 'Missing Phone', 'No phone number'))
+
+        # Values that were silently turned into NaN on import
+        for column in SOURCE_COLUMNS:
+            missing = frame[column].isna()
+            found.append(self._issues(frame, missing & presence[column], f'Unparseable {column}', f'{column} could not be parsed'))
+            found.append(self._issues(frame, missing & ~presence[column], f'Missing {column}', f'No {column}'))
+
+        gyg_price = pd.to_numeric(frame['GYG Price'], errors='coerce')
+        net_price = pd.to_numeric(frame['Net Price'], errors='coerce')
+        found.append(self._issues(frame, (gyg_price < 0) | (net_price < 0), 'Negative Price', 'GYG Price or Net Price below zero'))
+        found.append(self._issues(frame, net_price > gyg_price, 'Net Price Above GYG Price', 'Net Price is higher than GYG Price'))
+
+        adults = pd.to_numeric(frame['Adult'], errors='coerce')
+        invalid_adults = adults.notna() & ((adults <= 0) | (adults % 1 != 0))
+        found.append(self._issues(frame, invalid_adults, 'Invalid Adults', 'Adults: ' + adults[invalid_adults].astype(str)))
+
+        self.issues = pd.concat(found, ignore_index=True)
+        return self.issues
+
+    def _issues(self, frame, mask, issue, detail):
+        if not mask.any():
+            return pd.DataFrame(columns=QUARANTINE_COLUMNS)
+        issues = frame.loc[mask, ['Count', 'Booking Ref', 'Name']].copy()
+        issues['Issue'] = issue
+        issues['Detail'] = detail
+        return issues
+
+    #===========================================PERSISTENCE=======================================================#
+
+    def save(self):
+        # Replace the quarantine table with the latest scan, the caller commits
+        self.db_connection.execute('DELETE FROM quarantine;')
+        issues = self.issues.reindex(columns=QUARANTINE_COLUMNS)
+        rows = issues.astype(object).where(issues.notna(), None).itertuples(index=False, name=None)
+        self.db_connection.executemany('INSERT INTO quarantine VALUES (?, ?, ?, ?, ?);', rows)
+
+    def load(self):
+        try:
+            self.issues = pd.read_sql_query('SELECT * FROM quarantine;', self.db_connection)
+        except pd.io.sql.DatabaseError:
+            self.issues = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+        return self.issues
+
+    def summary(self):
+        # Number of flagged rows per issue
+        return self.issues['Issue'].value_counts().to_dict()
@@ -0,0 +1,168 @@
+import re
+import unicodedata
+from collections import Counter
+
+# Soundex digit for every consonant, vowels and 'y' separate repeated digits while 'h' and 'w' don't
+SOUNDEX_CODES = {letter: digit for digits, digit in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6'))
+                 for letter in digits}
+
+def normalize_name(name):
+    # Casefolded letters of any script, so accents, punctuation and spacing don't affect matching
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(char for char in name if not unicodedata.combining(char)).casefold()
+    return ' '.join(''.join(char if char.isalpha() else ' ' for char in name).split())
+
+def trigrams(name):
+    # Trigrams of the padded name, the padding weights the start of the name the most
+    padded = f"  {name} "
+    return set(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def phonetic_key(token):
+    # Soundex code of a single name token, e.g. both 'mohamed' and 'muhammad' become 'm53'
+    # Soundex only covers Latin letters, tokens in other scripts are matched by trigrams alone
+    if not token or not re.fullmatch('[a-z]+', token):
+        return ''
+    key = token[0]
+    previous = SOUNDEX_CODES.get(token[0], '')
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            key += digit
+        if char not in 'hw':
+            previous = digit
+    return key[:4]
+
+def phonetic_keys(name):
+    return set(key for key in map(phonetic_key, name.split()) if key)
+
+class NameIndex:
+    def __init__(self, max_postings=20000, max_candidates=2000):
+        # Trigrams more common than max_postings are skipped when rarer ones are available
+        self.max_postings = max_postings
+        self.max_candidates = max_candidates
+        self.clear()
+
+    def clear(self):
+        # Normalized name -> how many bookings carry it, and the original spellings it came from
+        self.counts = {}
+        self.spellings = {}
+
+        # Inverted indexes from trigram and from phonetic key to normalized names
+        self.postings = {}
+        self.phonetics = {}
+
+        # Name tokens -> normalized names, and phonetic key -> the distinct tokens that sound like it
+        self.tokens = {}
+        self.sound_tokens = {}
+
+    #=========================================INCREMENTAL MAINTENANCE=============================================#
+
+    def add_names(self, names):
+        # Index a column of customer names, each distinct name is processed once
+        for name, count in Counter(str(name) for name in names if isinstance(name, str)).items():
+            normalized = normalize_name(name)
+            if not normalized:
+                continue
+
+            if normalized not in self.counts:
+                self.counts[normalized] = 0
+                self.spellings[normalized] = Counter()
+                for gram in trigrams(normalized):
+                    self.postings.setdefault(gram, set()).add(normalized)
+                for key in phonetic_keys(normalized):
+                    self.phonetics.setdefault(key, set()).add(normalized)
+                for token in normalized.split():
+                    self.tokens.setdefault(token, set()).add(normalized)
+                    key = phonetic_key(token)
+                    if key:
+                        self.sound_tokens.setdefault(key, set()).add(token)
+
+            self.counts[normalized] += count
+            self.spellings[normalized][name] += count
+
+    def remove_names(self, names):
+        # Take names of deleted bookings out again, dropping them from the index once unused
+        for name, count in Counter(str(name) for name in names if isinstance(name, str)).items():
+            normalized = normalize_name(name)
+            if normalized not in self.counts:
+                continue
+
+            self.spellings[normalized][name] -= count
+            if self.spellings[normalized][name] <= 0:
+                del self.spellings[normalized][name]
+            self.counts[normalized] -= count
+
+            if self.counts[normalized] <= 0:
+                del self.counts[normalized]
+                del self.spellings[normalized]
+                for gram in trigrams(normalized):
+                    self._discard(self.postings, gram, normalized)
+                for key in phonetic_keys(normalized):
+                    self._discard(self.phonetics, key, normalized)
+                for token in normalized.split():
+                    self._discard(self.tokens, token, normalized)
+                    key = phonetic_key(token)
+                    if key and token not in self.tokens:
+                        self._discard(self.sound_tokens, key, token)
+
+    def _discard(self, index, key, normalized):
+        names = index.get(key)
+        if names is not None:
+            names.discard(normalized)
+            if not names:
+                del index[key]
+
+    #================================================SEARCH=======================================================#
+
+    def search(self, query, limit=50, threshold=0.3):
+        # Ranked (original name, score) pairs, the score mixes trigram similarity and matching sounds
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        query_grams = trigrams(normalized)
+        query_keys = phonetic_keys(normalized)
+
+        # Count shared trigrams, starting from the rarest ones
+        postings = sorted((self.postings[gram] for gram in query_grams if gram in self.postings), key=len)
+        selective = [names for names in postings if len(names) <= self.max_postings] or postings[:1]
+        shared = Counter()
+        for names in selective:
+            shared.update(names)
+        candidates = set(name for name, _ in shared.most_common(self.max_candidates))
+
+        # Names sounding like every token of the query are candidates too
+        sounding = [self.phonetics.get(key, set()) for key in query_keys]
+        if sounding:
+            sounding = set.intersection(*sorted(sounding, key=len))
+            if len(sounding) > self.max_candidates:
+                # Too common a sound to score every name, take names from the tokens spelled closest to the query first
+                # Only the few distinct tokens behind the sound are ranked, so the rarest spellings aren't crowded out
+                tokens = set().union(*(self.sound_tokens.get(key, set()) for key in query_keys))
+                closest = []
+                for token in sorted(tokens, key=lambda token: len(query_grams & trigrams(token)), reverse=True):
+                    closest.extend(self.tokens[token] & sounding)
+                    if len(closest) >= self.max_candidates:
+                        break
+                sounding = closest[:self.max_candidates]
+            candidates.update(sounding)
+
+        scored = []
+        for candidate in candidates:
+            candidate_grams = trigrams(candidate)
+            similarity = 2 * len(query_grams & candidate_grams) / (len(query_grams) + len(candidate_grams))
+            if query_keys:
+                sound = len(query_keys & phonetic_keys(candidate)) / len(query_keys)
+                score = 0.6 * similarity + 0.4 * sound
+            else:
+                score = similarity
+            if score >= threshold:
+                scored.append((score, candidate))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        results = []
+        for score, candidate in scored[:limit]:
+            for spelling in self.spellings[candidate]:
+                results.append((spelling, score))
+        return results
@@ -0,0 +1,162 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+class Span:
+    def __init__(self, instrumentation, name, rows=None):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        self.instrumentation.record(self.name, duration, self.rows, error=exc_type is not None)
+        return False
+
+class NullSpan:
+    # Returned while instrumentation is disabled, entering and leaving it does nothing
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Instrumentation:
+    def __init__(self, window=500, history=10000):
+        self.enabled = False
+        self.window = window
+
+        # Rolling durations per span name for the latency percentiles
+        self.samples = {}
+        self.last_rows = {}
+
+        # Every finished span, kept for the JSON lines export
+        self.spans = deque(maxlen=history)
+
+        # Spans are also recorded from the mail timer threads
+        self.lock = threading.Lock()
+
+        self.profiler = None
+
+    def span(self, name, rows=None):
+        # Time a block of code, the checks stay this cheap when disabled
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, rows)
+
+    def timed(self, name, rows=None):
+        # Decorator form of span, rows is called with the function's arguments after it returns
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name) as span:
+                    result = function(*args, **kwargs)
+                    if rows is not None:
+                        span.rows = rows(*args, **kwargs)
+                    return result
+            return wrapper
+        return decorator
+
+    def record(self, name, duration, rows=None, error=False):
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(duration)
+            self.last_rows[name] = rows
+            self.spans.append({
+                'name': name,
+                'timestamp': time.time(),
+                'duration_ms': round(duration * 1000, 3),
+                'rows': rows,
+                'thread': threading.current_thread().name,
+                'error': error,
+            })
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.last_rows = {}
+            self.spans.clear()
+
+    #===============================================LATENCIES=====================================================#
+
+    def stats(self):
+        # Rows of (name, count, p50 ms, p95 ms, max ms, last rows) over the rolling window
+        with self.lock:
+            samples = {name: sorted(durations) for name, durations in self.samples.items()}
+            last_rows = dict(self.last_rows)
+
+        rows = []
+        for name, durations in sorted(samples.items()):
+            rows.append((name, len(durations), self._percentile(durations, 0.50) * 1000, self._percentile(durations, 0.95) * 1000,
+                         durations[-1] * 1000, last_rows.get(name)))
+        return rows
+
+    def _percentile(self, durations, fraction):
+        if not durations:
+            return 0.0
+        return durations[int(round(fraction * (len(durations) - 1)))]
+
+    #================================================EXPORTER=====================================================#
+
+    def export_jsonl(self, file_path):
+        # Write the recorded spans to a JSON lines file for offline analysis, replacing its contents
+        with self.lock:
+            spans = list(self.spans)
+
+        with open(file_path, 'w') as file:
+            for span in spans:
+                file.write(json.dumps(span) + '\n')
+        return len(spans)
+
+    #================================================PROFILING====================================================#
+
+    @property
+    def profiling(self):
+        return self.profiler is not None
+
+    def start_profiling(self):
+        # Capture call timings with cProfile and allocations with tracemalloc
+        if self.profiler is not None:
+            return
+        self.profiler = cProfile.Profile()
+        tracemalloc.start()
+        self.profiler.enable()
+
+    def stop_profiling(self, limit=25):
+        # Stop the capture and return a text report of the hottest functions and allocation sites
+        if self.profiler is None:
+            return ""
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        report = io.StringIO()
+        pstats.Stats(self.profiler, stream=report).sort_stats('cumulative').print_stats(limit)
+        self.profiler = None
+
+        report.write(f"\nTop {limit} allocation sites:\n")
+        for stat in snapshot.statistics('lineno')[:limit]:
+            report.write(f"{stat}\n")
+        return report.getvalue()
+
+# Shared instance used by the application, set BOOKING_INSTRUMENTATION=1 to enable it at startup
+instrumentation = Instrumentation()
+instrumentation.enabled = os.environ.get('BOOKING_INSTRUMENTATION') == '1'
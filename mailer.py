@@ -0,0 +1,43 @@
+import datetime
+import os
+import smtplib
+import ssl
+import threading
+
+from email.message import EmailMessage
+from instrumentation import instrumentation
+
+@instrumentation.timed('send_mail')
+def send_mail(email_reciever, subject, body, attachments=None):
+    # Credentials are only needed once a mail is actually sent, so the read-only API can run without them
+    from credentials import email_password, email_sender
+
+    em = EmailMessage()
+    em['From'] = email_sender
+    em['To'] = email_reciever
+    em['Subject'] = subject
+    em.set_content(body)
+
+    context = ssl.create_default_context()
+
+    # Attach files if any, upload slots left empty are skipped
+    for attachment in attachments or []:
+        if not attachment:
+            continue
+        with open(attachment, 'rb') as file:
+            file_data = file.read()
+            file_name = os.path.basename(attachment)
+        em.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=file_name)
+
+    with smtplib.SMTP_SSL('smtp.gmail.com', 465, context=context) as smtp:
+        smtp.login(email_sender, email_password)
+        smtp.sendmail(email_sender, email_reciever, em.as_string())
+
+def schedule_mail(send_datetime, email_reciever, subject, body, attachments=None):
+    # Calculate the delay in seconds, a past send time sends right away
+    delay = max((send_datetime - datetime.datetime.now()).total_seconds(), 0)
+
+    # Always send from a timer thread, so the caller never waits for the SMTP server
+    timer = threading.Timer(delay, send_mail, args=(email_reciever, subject, body), kwargs={"attachments": attachments})
+    timer.start()
+    return timer
@@ -2,19 +2,26 @@ import tkinter as tk
 import pandas as pd
 import json
 import sqlite3
-import smtplib
 import datetime
-import threading
 import openpyxl
 import os
-import ssl
+import threading
 
 from tkinter import filedialog
 from tkinter import ttk
 from tkinter import messagebox
+from tkinter import simpledialog
 from tkcalendar import DateEntry
-from email.message import EmailMessage
-from credentials import email_password, email_sender
+from analytics import BookingAnalytics, DIMENSIONS
+from treeview_sync import TreeviewSync
+from instrumentation import instrumentation
+from booking_repository import BookingRepository
+from fuzzy_search import NameIndex
+from data_quality import DataQualityScanner, QUARANTINE_COLUMNS, source_presence
+from archive import BookingArchive
+from mailer import schedule_mail
+from search import filter_bookings
+from api_server import start_server_in_background, stop_server, DEFAULT_PORT
 
 class BookingManagementSystem:
     def __init__(self, root):
@@ -41,6 +48,7 @@ class BookingManagementSystem:
         file_menu.add_command(label="Import Data", command=self.import_data)
         file_menu.add_command(label="Export to Excel", command=self.export_to_excel)  # Add Export to Excel option
         file_menu.add_command(label="Update Excel", command=self.update_excel)
+        file_menu.add_command(label="Archive Past Bookings", command=self.archive_past_bookings)
         file_menu.add_separator()
         file_menu.add_command(label="Close", command=self.on_close)
 
@@ -59,6 +67,30 @@ class BookingManagementSystem:
         mail_menu.add_command(label="Mail to Customer", command=self.open_mail_window)
         mail_menu.add_command(label="Scheduled Mails", command=self.open_scheduled_mails_window)
 
+        # Reports Menu
+        reports_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Reports", menu=reports_menu)
+        reports_menu.add_command(label="Dashboard", command=self.open_dashboard_window)
+        reports_menu.add_command(label="Data Quality", command=self.open_data_quality_window)
+
+        # Debug Menu
+        debug_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Debug", menu=debug_menu)
+        self.instrumentation_enabled = tk.BooleanVar(value=instrumentation.enabled)
+        debug_menu.add_checkbutton(label="Enable Instrumentation", variable=self.instrumentation_enabled, command=self.toggle_instrumentation)
+        self.profiling_enabled = tk.BooleanVar(value=False)
+        debug_menu.add_checkbutton(label="Capture Profile (cProfile + tracemalloc)", variable=self.profiling_enabled, command=self.toggle_profiling)
+        debug_menu.add_separator()
+        debug_menu.add_command(label="Performance Overlay", command=self.open_performance_window)
+        debug_menu.add_command(label="Export Spans", command=self.export_spans)
+
+        # Tools Menu
+        tools_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="Tools", menu=tools_menu)
+        self.api_server = None
+        self.api_server_enabled = tk.BooleanVar(value=False)
+        tools_menu.add_checkbutton(label=f"Local API Server (port {DEFAULT_PORT})", variable=self.api_server_enabled, command=self.toggle_api_server)
+
         # Create a DataFrame for holding booking data
         self.booking_data = pd.DataFrame(columns=['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email', 'Phone No', 'Adult', 'GYG Price', 'Net Price'])
 
@@ -80,6 +112,9 @@ class BookingManagementSystem:
                 self.tree.bind('<B1-Motion>', lambda event, c=col, i=col_index: self.on_column_resizing(event, c))
                 self.tree.bind(f'<ButtonRelease-1>', self.on_column_release)
                 
+        # Reconciles the treeview with the booking data instead of rebuilding it
+        self.tree_sync = TreeviewSync(self.tree)
+
         # Bind double click event to the treeview
         self.tree.bind('<Double-1>', self.on_row_double_click)
 
@@ -108,8 +143,30 @@ class BookingManagementSystem:
 
         # SQLite Database connection
         self.db_connection = sqlite3.connect('booking_data.db')
+
+        # WAL lets the local API and other readers see the last saved data while the bookings are being rewritten
+        self.db_connection.execute('PRAGMA journal_mode=WAL;')
+        self.db_connection.execute('PRAGMA busy_timeout=5000;')
         self.create_table_if_not_exists()
 
+        # Precomputed booking aggregates for the dashboard
+        self.analytics = BookingAnalytics(self.db_connection)
+
+        # Duplicate and validation checks run on every import, findings go to the quarantine table
+        self.data_quality = DataQualityScanner(self.db_connection)
+
+        # Monthly archive partitions for bookings whose travel date is long past
+        self.archive = BookingArchive()
+
+        # Booking lookups for mail autofill and double click
+        self.booking_repository = BookingRepository(archive=self.archive)
+
+        # Trigram and phonetic index over customer names for fuzzy search, built off the Tk thread after every load
+        self.name_index = NameIndex()
+        self.name_index_built = False
+        self.name_index_lock = threading.Lock()
+        self.name_index_generation = 0
+
         # Load data from the SQLite database
         self.load_data_from_db()
 
@@ -126,8 +183,9 @@ class BookingManagementSystem:
         file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
         if file_path:
             try:
-                # Write data to Excel file
-                self.booking_data.to_excel(file_path, index=False)
+                # Write data to Excel file, only the write is timed and not the dialogs around it
+                with instrumentation.span('export_to_excel', rows=len(self.booking_data)):
+                    self.booking_data.to_excel(file_path, index=False)
                 messagebox.showinfo("Export Successful", f"Data exported to {file_path} successfully.")
             except Exception as e:
                 messagebox.showerror("Export Error", f"An error occurred while exporting data: {e}")
@@ -144,29 +202,32 @@ class BookingManagementSystem:
             try:
                 # Read the existing Excel file if it exists
                 if os.path.exists(file_path):
-                    wb = openpyxl.load_workbook(file_path)
-                    ws = wb.active
-
-                    # Get the existing booking references from the Excel sheet
-                    existing_booking_refs = set(ws.cell(row=row_index, column=5).value for row_index in range(2, ws.max_row + 1))
-
-                    # Get only the relevant columns from the DataFrame
-                    relevant_columns = self.booking_data[['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email', 'Phone No', 'Adult', 'GYG Price', 'Net Price']]
-
-                    # Append new entries to the Excel file
-                    for index, row in relevant_columns.iterrows():
-                        booking_ref = row['Booking Ref']
-                        if booking_ref not in existing_booking_refs:
-                            values = row.tolist()
-                            ws.append(values)
-                            existing_booking_refs.add(booking_ref)
-
-                    # Save the updated Excel file
-                    wb.save(file_path)
+                    # Only the workbook load, append and save are timed, not the dialogs around them
+                    with instrumentation.span('update_excel', rows=len(self.booking_data)):
+                        wb = openpyxl.load_workbook(file_path)
+                        ws = wb.active
+
+                        # Get the existing booking references from the Excel sheet
+                        existing_booking_refs = set(ws.cell(row=row_index, column=5).value for row_index in range(2, ws.max_row + 1))
+
+                        # Get only the relevant columns from the DataFrame
+                        relevant_columns = self.booking_data[['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email', 'Phone No', 'Adult', 'GYG Price', 'Net Price']]
+
+                        # Append new entries to the Excel file
+                        for index, row in relevant_columns.iterrows():
+                            booking_ref = row['Booking Ref']
+                            if booking_ref not in existing_booking_refs:
+                                values = row.tolist()
+                                ws.append(values)
+                                existing_booking_refs.add(booking_ref)
+
+                        # Save the updated Excel file
+                        wb.save(file_path)
                     messagebox.showinfo("Update Successful", f"Data updated in {file_path} successfully.")
                 else:
                     # If the file doesn't exist, simply export the data
-                    self.booking_data[['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email', 'Phone No', 'Adult', 'GYG Price', 'Net Price']].to_excel(file_path, index=False)
+                    with instrumentation.span('export_to_excel', rows=len(self.booking_data)):
+                        self.booking_data[['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email', 'Phone No', 'Adult', 'GYG Price', 'Net Price']].to_excel(file_path, index=False)
                     messagebox.showinfo("Export Successful", f"Data exported to {file_path} successfully.")
             except Exception as e:
                 messagebox.showerror("Update Error", f"An error occurred while updating data: {e}")
@@ -206,64 +267,27 @@ class BookingManagementSystem:
             if file_path:
                 dubai_tickets_label.config(text=file_path)
                 
-        def send_mail(email_reciever, subject, body, send_datetime=None, **kwargs):
-            em = EmailMessage()
-            em['From'] = email_sender
-            em['To'] = email_reciever
-            em['Subject'] = subject
-            em.set_content(body)
-            
-            context = ssl.create_default_context()
-            
-            attachments = kwargs.get('attachments', None)
-                
-            # Attach files if any
-            if attachments:
-                for attachment in attachments:
-                    with open(attachment, 'rb') as file:
-                        file_data = file.read()
-                        file_name = os.path.basename(attachment)
-                    em.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=file_name)
-                    
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465, context=context) as smtp:
-                smtp.login(email_sender, email_password)
-                smtp.sendmail(email_sender, email_reciever, em.as_string())
-                
         def fetch_data():
             booking_ref = booking_ref_entry.get()
             if booking_ref:
-                # Connect to the database
-                conn = sqlite3.connect('booking_data.db')
-                conn.row_factory = sqlite3.Row  # Set row_factory to get rows as dictionaries
+                # Look up the booking in the repository, only archived bookings are read from disk
+                record = self.booking_repository.get(booking_ref)
 
-                # Create a cursor
-                cursor = conn.cursor()
-
-                # Execute the query
-                cursor.execute("SELECT Name, Email, [Phone No], [Travel Date] FROM bookings WHERE [Booking Ref]=?", (booking_ref,))
-
-                # Fetch one row
-                row = cursor.fetchone()
-
-                if row:
+                if record:
                     # Autofill customer name, email, phone, and travel date fields
                     customer_name_entry.delete(0, tk.END)
-                    customer_name_entry.insert(0, row['Name'])
+                    customer_name_entry.insert(0, record.get('Name', ''))
                     
                     customer_mail_entry.delete(0, tk.END)
-                    customer_mail_entry.insert(0, row['Email'])
+                    customer_mail_entry.insert(0, record.get('Email', ''))
 
                     customer_phone_entry.delete(0, tk.END)
-                    customer_phone_entry.insert(0, row['Phone No'])
+                    customer_phone_entry.insert(0, record.get('Phone No', ''))
 
                     customer_travel_date_entry.delete(0, tk.END)
-                    customer_travel_date_entry.insert(0, row['Travel Date'])
+                    customer_travel_date_entry.insert(0, record.get('Travel Date', ''))
                 else:
                     messagebox.showerror("Error", "No data found for the given booking reference.")
-
-                # Close the cursor and connection
-                cursor.close()
-                conn.close()
             else:
                 messagebox.showerror("Error", "Please enter a booking reference.")
 
@@ -355,17 +379,9 @@ class BookingManagementSystem:
                     body = mail_body_entry.get('1.0', 'end')
                     attachments = [museum_tickets_label.cget("text"), dubai_tickets_label.cget("text")]
 
-                    # Calculate the delay in seconds
-                    delay = (send_datetime - datetime.datetime.now()).total_seconds()
-
-                    # If the delay is negative, send the mail immediately
-                    if delay <= 0:
-                        send_mail(email_receiver, subject, body, attachments=attachments)
-                        return True
-                    else:
-                        # Wait for the specified time before sending the mail
-                        threading.Timer(delay, send_mail, args=(email_receiver, subject, body), kwargs={"attachments": attachments}).start()
-                        return True
+                    # Start a timer for the scheduled time, a time in the past sends right away
+                    schedule_mail(send_datetime, email_receiver, subject, body, attachments=attachments)
+                    return True
             except Exception as e:
                 print(e)  # Handle exceptions as needed
                 return False
@@ -385,17 +401,20 @@ class BookingManagementSystem:
         # Get the selected item from the event
         item = self.tree.selection()[0]
         
-        # Get the data of the selected row
-        selected_row = self.tree.item(item, 'values')
-        
-        # print(selected_row)  # Add this line to print the selected row
-        
-        # Extract relevant information from the selected row
-        booking_ref = selected_row[4]  # Booking Reference
-        customer_name = selected_row[5]  # Customer Name
-        customer_email = selected_row[7]  # Customer Email
-        customer_phone = selected_row[8]  # Customer Phone No
-        customer_travel_date = selected_row[2]  # Customer Travel Date
+        # Resolve the booking by its ref and occurrence, so repeated refs open their own booking
+        key = self.tree_sync.key_for_item(item)
+        record = self.booking_repository.get(*key) if key else None
+
+        # Fall back to the row values matched by column name
+        if record is None:
+            record = dict(zip(self.tree['columns'], self.tree.item(item, 'values')))
+
+        # Extract relevant information from the booking
+        booking_ref = record.get('Booking Ref', '')  # Booking Reference
+        customer_name = record.get('Name', '')  # Customer Name
+        customer_email = record.get('Email', '')  # Customer Email
+        customer_phone = record.get('Phone No', '')  # Customer Phone No
+        customer_travel_date = record.get('Travel Date', '')  # Customer Travel Date
 
         # Open the mail window with the extracted details
         self.open_mail_window(booking_ref, customer_name, customer_email, customer_phone, customer_travel_date)
@@ -406,6 +425,8 @@ class BookingManagementSystem:
         # Save data to the SQLite database before closing
         self.save_data_to_db()
         self.load_column_configuration()
+        if self.api_server is not None:
+            stop_server(self.api_server)
         self.root.destroy()
     
     def create_table_if_not_exists(self):
@@ -427,14 +448,45 @@ class BookingManagementSystem:
         );
         '''
         self.db_connection.execute(query)
-        self.db_connection.commit()
 
-    def save_data_to_db(self):
-        # Save data to the SQLite database
-        self.db_connection.execute('DELETE FROM bookings;')  # Clear existing data
-        self.booking_data.to_sql('bookings', self.db_connection, index=False, if_exists='replace')
+        # Version of the saved bookings, readers use it to tell whether their cached results are still valid
+        self.db_connection.execute('CREATE TABLE IF NOT EXISTS store_meta (Version INTEGER NOT NULL);')
+        self.db_connection.execute('INSERT INTO store_meta (Version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM store_meta);')
         self.db_connection.commit()
 
+    @instrumentation.timed('save_data_to_db', rows=lambda self, *args: len(self.booking_data))
+    def save_data_to_db(self):
+        # Save data to the SQLite database in a single transaction, so readers see either the previous save or this one
+        try:
+            self.db_connection.execute('BEGIN;')
+            self.write_bookings(self.booking_data)
+            self.db_connection.execute('UPDATE store_meta SET Version = Version + 1;')
+            self.analytics.save(self.bookings_version())
+            self.data_quality.save()
+            self.db_connection.commit()
+        except Exception:
+            self.db_connection.rollback()
+            raise
+
+        # The database now matches the loaded bookings, so both can be served from memory again
+        self.booking_repository.invalidate()
+        self.booking_repository.warm(self.booking_data)
+
+    def bookings_version(self):
+        # Bumped on every save, in the same transaction as the bookings
+        return self.db_connection.execute('SELECT Version FROM store_meta;').fetchone()[0]
+
+    def write_bookings(self, data):
+        # Replace the bookings table with data, to_sql isn't used as it commits on its own
+        self.db_connection.execute('DROP TABLE IF EXISTS bookings;')
+        self.db_connection.execute(pd.io.sql.get_schema(data, 'bookings', con=self.db_connection))
+
+        columns = ', '.join(f'"{col}"' for col in data.columns)
+        placeholders = ', '.join('?' for _ in data.columns)
+        rows = data.astype(object).where(data.notna(), None).itertuples(index=False, name=None)
+        self.db_connection.executemany(f'INSERT INTO bookings ({columns}) VALUES ({placeholders});', rows)
+
+    @instrumentation.timed('load_data_from_db', rows=lambda self, *args: len(self.booking_data))
     def load_data_from_db(self):
         # Load data from the SQLite database
         try:
@@ -445,6 +497,19 @@ class BookingManagementSystem:
             self.booking_data = pd.DataFrame(columns=['Booking_Date', 'Travel_Date', 'Product', 'Booking_Ref', 'Name', 'Country', 'Phone_No', 'Adult', 'GYG_Price', 'Net_Price', 'Email'])
             self.update_treeview()
 
+        # Use the persisted aggregates, recompute them only if they don't match the loaded and archived bookings
+        if not self.analytics.load(self.bookings_version(), len(self.booking_data) + self.archive.row_count()):
+            self.analytics.rebuild(pd.concat([self.booking_data, self.archive.load_all()], ignore_index=True))
+
+        # Quarantined rows from the last import
+        self.data_quality.load()
+
+        # Warm the booking lookups with the loaded bookings
+        self.booking_repository.warm(self.booking_data)
+
+        # Index the customer names in the background, so startup doesn't wait for it
+        self.build_name_index_in_background()
+
     def import_data(self):
         file_path = filedialog.askopenfilename(filetypes=[('Excel Files', '*.xlsx;*.xls')])
         if file_path:
@@ -532,40 +597,125 @@ class BookingManagementSystem:
         except Exception as e:
             print(f"Error loading column configuration: {e}")
 
+    #===================================================ARCHIVE DATA===================================================#
+
+    def archive_past_bookings(self):
+        # Ask how many days after travel a booking stays in the working set
+        horizon_days = simpledialog.askinteger("Archive Past Bookings", "Archive bookings that travelled more than this many days ago:",
+                                               initialvalue=self.archive.horizon_days, minvalue=0, parent=self.root)
+        if horizon_days is None:
+            return
+
+        try:
+            kept, archived = self.archive.archive(self.booking_data, horizon_days)
+        except Exception as e:
+            messagebox.showerror("Archive Error", f"An error occurred while archiving bookings: {e}")
+            return
+
+        if archived.empty:
+            messagebox.showinfo("Nothing to Archive", f"No bookings travelled more than {horizon_days} days ago.")
+            return
+
+        # The dashboard keeps counting archived bookings, only the working set shrinks
+        previous = self.booking_data
+        self.booking_data = kept.reset_index(drop=True)
+        try:
+            self.save_data_to_db()
+        except Exception as e:
+            # The database still holds the archived bookings, so they are taken back out of the partitions to be counted once
+            self.booking_data = previous
+            message = f"An error occurred while saving the remaining bookings: {e}"
+            try:
+                self.archive.unarchive(archived)
+            except Exception as undo_error:
+                message += f"\nRemoving them from the archive again failed as well: {undo_error}"
+            messagebox.showerror("Archive Error", message)
+            return
+
+        if self.name_index_built:
+            self.name_index.remove_names(archived['Name'])
+        else:
+            self.build_name_index_in_background()
+
+        self.revert_filter()
+        messagebox.showinfo("Archive Successful", f"{len(archived)} bookings moved to the archive.")
+
     #===================================================IMPORT DATA====================================================#
 
     def import_data(self):
         file_path = filedialog.askopenfilename(filetypes=[('Excel Files', '*.xlsx;*.xls')])
         if file_path:
             try:
-                all_data = pd.read_excel(file_path, sheet_name=None)
+                # Reading and transforming the workbook are timed, the file dialog is not
+                with instrumentation.span('read_excel') as span:
+                    all_data = pd.read_excel(file_path, sheet_name=None)
+                    span.rows = sum(len(data) for data in all_data.values())
+
+                # Take the replaced bookings out of the aggregates, archived bookings stay counted
+                self.analytics.remove_rows(self.booking_data)
 
                 # Clear existing data in the DataFrame
                 self.booking_data = pd.DataFrame(columns=['Count', 'Booking Date', 'Travel Date', 'Product', 'Booking Ref', 'Name', 'Country', 'Email'])
+                self.booking_repository.invalidate()
+
+                # The names are indexed sheet by sheet below, any background build still running is discarded
+                with self.name_index_lock:
+                    self.name_index_generation += 1
+                    self.name_index = NameIndex()
+                    self.name_index_built = True
 
                 count = 0
+                presence = []
+                skipped = 0
 
                 # Iterate through all sheets and append data to the DataFrame
-                for sheet_name, data in all_data.items():
-                    sheet_data = pd.DataFrame()
-                    sheet_data['Booking Date'] = pd.to_datetime(data['Purchase Date (local time)'], format='%d/%m/%Y %H:%M', errors='coerce').dt.strftime('%d/%m/%Y %H:%M')
-                    sheet_data['Travel Date'] = pd.to_datetime(data['Date'], format='%d/%m/%Y', errors='coerce').dt.strftime('%d/%m/%Y')
-                    sheet_data['Product'] = data['Product']
-                    sheet_data['Booking Ref'] = data['Booking Ref #']
-                    sheet_data['Name'] = data['Traveler\'s First Name'] + ' ' + data['Traveler\'s Last Name']
-                    sheet_data['Country'] = data['Traveler\'s Country']
-                    sheet_data['Phone No'] = data['Phone']
-                    sheet_data['Adult'] = pd.to_numeric(data['Adult'], errors='coerce')
-                    sheet_data['GYG Price'] = pd.to_numeric(data['Price'].str.replace(' AED', ''), errors='coerce')
-                    sheet_data['Net Price'] = pd.to_numeric(data['Net Price'].str.replace(' AED', ''), errors='coerce')
-                    sheet_data['Email'] = data['Email']
-                    sheet_data['Count'] = range(count + 1, count + 1 + len(sheet_data))
-                    count += len(sheet_data)
-
-                    # Append data to the main DataFrame
-                    self.booking_data = pd.concat([self.booking_data, sheet_data], ignore_index=True)
-                    
-
+                with instrumentation.span('import_data') as span:
+                    for sheet_name, data in all_data.items():
+                        sheet_data = pd.DataFrame()
+                        sheet_data['Booking Date'] = pd.to_datetime(data['Purchase Date (local time)'], format='%d/%m/%Y %H:%M', errors='coerce').dt.strftime('%d/%m/%Y %H:%M')
+                        sheet_data['Travel Date'] = pd.to_datetime(data['Date'], format='%d/%m/%Y', errors='coerce').dt.strftime('%d/%m/%Y')
+                        sheet_data['Product'] = data['Product']
+                        sheet_data['Booking Ref'] = data['Booking Ref #']
+                        sheet_data['Name'] = data['Traveler\'s First Name'] + ' ' + data['Traveler\'s Last Name']
+                        sheet_data['Country'] = data['Traveler\'s Country']
+                        sheet_data['Phone No'] = data['Phone']
+                        sheet_data['Adult'] = pd.to_numeric(data['Adult'], errors='coerce')
+                        sheet_data['GYG Price'] = pd.to_numeric(data['Price'].str.replace(' AED', ''), errors='coerce')
+                        sheet_data['Net Price'] = pd.to_numeric(data['Net Price'].str.replace(' AED', ''), errors='coerce')
+                        sheet_data['Email'] = data['Email']
+
+                        # Bookings that were archived before are already counted there and are left out of the working set
+                        # Archiving accepts any horizon down to today, so every past travel month of the sheet is checked
+                        archived_refs = self.archive.archived_refs(sheet_data, horizon_days=0)
+                        already_archived = sheet_data['Booking Ref'].isin(archived_refs)
+                        sheet_data = sheet_data[~already_archived].copy()
+                        skipped += int(already_archived.sum())
+
+                        sheet_data['Count'] = range(count + 1, count + 1 + len(sheet_data))
+                        count += len(sheet_data)
+
+                        # Append data to the main DataFrame
+                        self.booking_data = pd.concat([self.booking_data, sheet_data], ignore_index=True)
+                        self.analytics.add_rows(sheet_data)
+                        self.name_index.add_names(sheet_data['Name'])
+                        presence.append(source_presence(data)[~already_archived])
+                    span.rows = len(self.booking_data)
+
+                # Check the merged sheets for duplicates and invalid values in a single pass
+                # The bookings are already replaced at this point, so a failing check must not fail the import
+                if presence:
+                    try:
+                        issues = self.data_quality.scan(self.booking_data, pd.concat(presence, ignore_index=True))
+                        if not issues.empty:
+                            print(f"{len(issues)} data quality issues found, see Reports > Data Quality")
+                    except Exception as e:
+                        self.data_quality.issues = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+                        print(f"Error checking data quality: {e}")
+
+                if skipped:
+                    print(f"{skipped} bookings skipped as they are already archived")
+
+                self.booking_repository.warm(self.booking_data)
                 self.update_treeview()
                 print("Data Imported and Transformed Successfully!")
             except Exception as e:
@@ -582,7 +732,7 @@ class BookingManagementSystem:
         tk.Label(search_dialog, text="Select Search Criteria:").grid(row=0, column=0, padx=10, pady=10)
         search_criteria_var = tk.StringVar()
         search_criteria_var.set("Booking Ref")  # Set default value
-        search_criteria_menu = ttk.Combobox(search_dialog, textvariable=search_criteria_var, values=['Booking Ref', 'Customer Name', 'No of Adults', 'Travel Date'])
+        search_criteria_menu = ttk.Combobox(search_dialog, textvariable=search_criteria_var, values=['Booking Ref', 'Customer Name', 'Customer Name (Fuzzy)', 'No of Adults', 'Travel Date'])
         search_criteria_menu.grid(row=0, column=1, padx=10, pady=10)
 
         # Create a label and entry widget for entering search value
@@ -610,26 +760,52 @@ class BookingManagementSystem:
         # Bind the function to the search criteria dropdown
         search_criteria_menu.bind("<<ComboboxSelected>>", lambda event: toggle_input_widget())
 
+        # Create a checkbox for also searching the archived bookings
+        include_archive_var = tk.BooleanVar(value=False)
+        include_archive_check = tk.Checkbutton(search_dialog, text="Include Archive", variable=include_archive_var)
+        include_archive_check.grid(row=3, column=0, columnspan=2, padx=10, pady=5)
+
         # Create a button to apply the search
-        search_button = tk.Button(search_dialog, text="Search", command=lambda: self.apply_search(search_criteria_var.get(), search_value_var.get(), date_var.get(), search_dialog))
-        search_button.grid(row=3, column=0, columnspan=2, pady=10)
+        search_button = tk.Button(search_dialog, text="Search", command=lambda: self.apply_search(search_criteria_var.get(), search_value_var.get(), date_var.get(), search_dialog, include_archive_var.get()))
+        search_button.grid(row=4, column=0, columnspan=2, pady=10)
 
         # Enable or disable "Revert Filter" based on the filter status
         self.search_menu.entryconfig("Revert Filter", state=tk.NORMAL if self.revert_filter_enabled else tk.DISABLED)
 
-    def apply_search(self, criteria, value, date_value, search_dialog):
+    def build_name_index_in_background(self):
+        # Index the names of the current bookings on a worker thread, the finished index replaces the current one
+        with self.name_index_lock:
+            self.name_index_generation += 1
+            generation = self.name_index_generation
+            self.name_index_built = False
+        names = self.booking_data['Name'] if 'Name' in self.booking_data.columns else []
+
+        def build():
+            name_index = NameIndex()
+            name_index.add_names(names)
+            with self.name_index_lock:
+                # An import or a newer build replaced the bookings in the meantime
+                if generation == self.name_index_generation:
+                    self.name_index = name_index
+                    self.name_index_built = True
+
+        threading.Thread(target=build, name='name-index', daemon=True).start()
+
+    @instrumentation.timed('apply_search', rows=lambda self, *args: len(self.tree.get_children()))
+    def apply_search(self, criteria, value, date_value, search_dialog, include_archive=False):
+        # Until the name index is ready, fuzzy search falls back to the plain name search
+        if criteria == 'Customer Name (Fuzzy)' and not self.name_index_built:
+            print("Name index is still being built, searching names by substring instead")
+            criteria = 'Customer Name'
+
         # Apply the search and update the treeview
-        if criteria == 'Booking Ref':
-            result = self.booking_data[self.booking_data['Booking Ref'].astype(str).str.contains(value, case=False)]
-        elif criteria == 'Customer Name':
-            result = self.booking_data[self.booking_data['Name'].astype(str).str.contains(value, case=False)]
-        elif criteria == 'No of Adults':
-            result = self.booking_data[self.booking_data['Adult'] == int(value)]
-        elif criteria == 'Travel Date':
-            result = self.booking_data[self.booking_data['Travel Date'] == date_value]
+        result = filter_bookings(self.booking_data, criteria, value, date_value, self.name_index)
 
         # Update the treeview with the search result
-        self.update_treeview(data=result)
+        if include_archive:
+            self.show_with_archive(result, self.archive.search(criteria, value, date_value))
+        else:
+            self.update_treeview(data=result)
 
         # Set the flag to indicate that a filter is applied
         self.revert_filter_enabled = True
@@ -640,6 +816,12 @@ class BookingManagementSystem:
         # Destroy the search dialog
         search_dialog.destroy()
 
+    def show_with_archive(self, result, archived):
+        # Archived rows get index labels after the loaded bookings so the treeview can tell them apart
+        archived = archived.reindex(columns=self.booking_data.columns)
+        archived.index = pd.RangeIndex(len(self.booking_data), len(self.booking_data) + len(archived))
+        self.update_treeview(data=pd.concat([result, archived]), all_data=pd.concat([self.booking_data, archived]))
+
     def revert_filter(self):
         # Revert the filter and update the treeview
         self.update_treeview(data=self.booking_data)
@@ -650,23 +832,194 @@ class BookingManagementSystem:
         # Disable "Revert Filter" since no filter is applied
         self.search_menu.entryconfig("Revert Filter", state=tk.DISABLED)
 
-    def update_treeview(self, data=None):
-        # Clear existing items in the treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Insert new data into the treeview
+    @instrumentation.timed('update_treeview', rows=lambda self, data=None, all_data=None: len(self.booking_data if data is None else data))
+    def update_treeview(self, data=None, all_data=None):
+        # Show the given rows, or all bookings if none are given
         if data is None:
             data = self.booking_data
+        if all_data is None:
+            all_data = self.booking_data
 
-        for index, row in data.iterrows():
-            values = row.tolist()
-            values[-1] = int(values[-1])  # Convert 'Adult' column to integer without decimal points
-            values[-2] = str(values[-2]) if pd.notna(values[-2]) else ""  # Convert 'Phone No' column to string
-            self.tree.insert('', index, values=row.tolist(), tags=("style",))
+        # Apply only the inserts, deletes, moves and value updates between the shown and the new rows
+        self.tree_sync.sync(data, all_data)
 
         self.save_column_configuration()
 
+    #==================================================DASHBOARD====================================================#
+    def open_dashboard_window(self):
+        dashboard_window = tk.Toplevel(self.root)
+        dashboard_window.title("Booking Dashboard")
+        dashboard_window.iconbitmap("./icon.ico")
+
+        # Summary line with the overall totals
+        summary_label = tk.Label(dashboard_window, font=("Arial", 11, "bold"))
+        summary_label.pack(fill=tk.X, padx=10, pady=10)
+
+        # One tab per aggregate dimension
+        notebook = ttk.Notebook(dashboard_window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        tab_titles = {'travel_day': 'Per Travel Date', 'booking_day': 'Per Booking Date', 'product': 'Per Product', 'country': 'Per Country'}
+        columns = ["Key", "Bookings", "Adults", "GYG Price", "Net Price", "Margin"]
+        dashboard_trees = {}
+
+        for dimension in DIMENSIONS:
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=tab_titles[dimension])
+
+            tree = ttk.Treeview(frame, columns=columns, show='headings')
+            tree.tag_configure("style", background="white", foreground="black")
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=120, anchor='center')
+
+            y_scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+            tree.configure(yscrollcommand=y_scrollbar.set)
+            y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            tree.pack(fill=tk.BOTH, expand=True)
+            dashboard_trees[dimension] = tree
+
+        def refresh_dashboard():
+            # The aggregates are already materialized, refreshing only redraws them
+            summary = self.analytics.summary()
+            summary_label.config(text=f"Bookings: {summary['Bookings']}    Adults: {summary['Adults']:.0f}    "
+                                      f"GYG Price: {summary['GYG Price']:.2f} AED    Net Price: {summary['Net Price']:.2f} AED    "
+                                      f"Margin: {summary['Margin']:.2f} AED")
+
+            for dimension, tree in dashboard_trees.items():
+                tree.delete(*tree.get_children())
+                for key, bookings, adults, gyg_price, net_price, margin in self.analytics.table(dimension):
+                    tree.insert('', tk.END, values=(key, bookings, f"{adults:.0f}", f"{gyg_price:.2f}", f"{net_price:.2f}", f"{margin:.2f}"), tags=("style",))
+
+        refresh_button = tk.Button(dashboard_window, text="Refresh", command=refresh_dashboard)
+        refresh_button.pack(pady=10)
+
+        refresh_dashboard()
+
+    #=================================================DATA QUALITY==================================================#
+    def open_data_quality_window(self):
+        data_quality_window = tk.Toplevel(self.root)
+        data_quality_window.title("Data Quality")
+        data_quality_window.iconbitmap("./icon.ico")
+
+        # Number of flagged rows per issue
+        summary = self.data_quality.summary()
+        summary_text = "    ".join(f"{issue}: {count}" for issue, count in summary.items()) or "No issues found in the last import."
+        tk.Label(data_quality_window, text=summary_text, wraplength=900, justify=tk.LEFT).pack(fill=tk.X, padx=10, pady=10)
+
+        # Create a treeview widget to display the quarantined rows
+        quarantine_frame = ttk.Frame(data_quality_window)
+        quarantine_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        columns = ["Count", "Booking Ref", "Name", "Issue", "Detail"]
+        quarantine_tree = ttk.Treeview(quarantine_frame, columns=columns, show='headings')
+        quarantine_tree.tag_configure("style", background="white", foreground="black")
+
+        for col in columns:
+            quarantine_tree.heading(col, text=col)
+            quarantine_tree.column(col, width=150, anchor='center')
+
+        y_scrollbar = ttk.Scrollbar(quarantine_frame, orient='vertical', command=quarantine_tree.yview)
+        quarantine_tree.configure(yscrollcommand=y_scrollbar.set)
+        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        quarantine_tree.pack(fill=tk.BOTH, expand=True)
+
+        for row in self.data_quality.issues.itertuples(index=False, name=None):
+            quarantine_tree.insert('', tk.END, values=["" if pd.isna(value) else value for value in row], tags=("style",))
+
+        def show_affected_bookings():
+            # Filter the main table down to the bookings with at least one issue
+            result = self.booking_data[self.booking_data['Count'].isin(self.data_quality.issues['Count'])]
+            self.update_treeview(data=result)
+            self.revert_filter_enabled = True
+            self.search_menu.entryconfig("Revert Filter", state=tk.NORMAL)
+            data_quality_window.destroy()
+
+        show_button = tk.Button(data_quality_window, text="Show Affected Bookings", command=show_affected_bookings)
+        show_button.pack(pady=10)
+
+    #==============================================PERFORMANCE======================================================#
+    def toggle_instrumentation(self):
+        # Spans are only recorded while instrumentation is enabled
+        instrumentation.enabled = self.instrumentation_enabled.get()
+
+    def toggle_profiling(self):
+        if self.profiling_enabled.get():
+            instrumentation.start_profiling()
+            return
+
+        # Show the captured profile once the capture is stopped
+        report = instrumentation.stop_profiling()
+        report_window = tk.Toplevel(self.root)
+        report_window.title("Profile Report")
+        report_window.iconbitmap("./icon.ico")
+
+        report_text = tk.Text(report_window, wrap=tk.NONE, font=("Courier", 9))
+        y_scrollbar = ttk.Scrollbar(report_window, orient='vertical', command=report_text.yview)
+        report_text.configure(yscrollcommand=y_scrollbar.set)
+        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        report_text.pack(fill=tk.BOTH, expand=True)
+        report_text.insert('1.0', report)
+        report_text.config(state=tk.DISABLED)
+
+    def open_performance_window(self):
+        performance_window = tk.Toplevel(self.root)
+        performance_window.title("Performance Overlay")
+        performance_window.iconbitmap("./icon.ico")
+        performance_window.attributes('-topmost', True)
+
+        # Create a treeview with the rolling latencies of every span
+        columns = ["Span", "Count", "p50 (ms)", "p95 (ms)", "Max (ms)", "Last Rows"]
+        performance_tree = ttk.Treeview(performance_window, columns=columns, show='headings')
+        performance_tree.tag_configure("style", background="white", foreground="black")
+
+        for col in columns:
+            performance_tree.heading(col, text=col)
+            performance_tree.column(col, width=100, anchor='center')
+
+        performance_tree.pack(fill=tk.BOTH, expand=True)
+
+        status_label = tk.Label(performance_window)
+        status_label.pack(pady=5)
+
+        def refresh_overlay():
+            # Stop refreshing once the overlay is closed
+            if not performance_window.winfo_exists():
+                return
+
+            performance_tree.delete(*performance_tree.get_children())
+            for name, count, p50, p95, maximum, rows in instrumentation.stats():
+                performance_tree.insert('', tk.END, values=(name, count, f"{p50:.1f}", f"{p95:.1f}", f"{maximum:.1f}", "" if rows is None else rows), tags=("style",))
+
+            status_label.config(text="Recording" if instrumentation.enabled else "Instrumentation disabled, enable it from the Debug menu")
+            performance_window.after(1000, refresh_overlay)
+
+        refresh_overlay()
+
+    def export_spans(self):
+        # Ask user for the JSON lines file to write the spans to
+        file_path = filedialog.asksaveasfilename(defaultextension=".jsonl", filetypes=[("JSON Lines", "*.jsonl")])
+        if file_path:
+            try:
+                exported = instrumentation.export_jsonl(file_path)
+                messagebox.showinfo("Export Successful", f"{exported} spans exported to {file_path} successfully.")
+            except Exception as e:
+                messagebox.showerror("Export Error", f"An error occurred while exporting spans: {e}")
+
+    #==================================================TOOLS======================================================#
+
+    def toggle_api_server(self):
+        # Serve the saved bookings over HTTP for other local tools, reads go straight to the database
+        if self.api_server_enabled.get():
+            try:
+                self.api_server = start_server_in_background('booking_data.db', archive=self.archive)
+            except OSError as e:
+                self.api_server_enabled.set(False)
+                messagebox.showerror("API Server Error", f"Could not start the local API server: {e}")
+        elif self.api_server is not None:
+            stop_server(self.api_server)
+            self.api_server = None
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = BookingManagementSystem(root)
@@ -3,6 +3,23 @@ from tkinter import ttk
 import pandas as pd
 import json
 
+def filter_bookings(booking_data, criteria, value, date_value=None, name_index=None):
+    # Rows of booking_data matching one of the search dialog criteria
+    if criteria == 'Booking Ref':
+        return booking_data[booking_data['Booking Ref'].astype(str).str.contains(value, case=False, regex=False)]
+    elif criteria == 'Customer Name':
+        return booking_data[booking_data['Name'].astype(str).str.contains(value, case=False, regex=False)]
+    elif criteria == 'Customer Name (Fuzzy)':
+        # Bookings whose customer name resembles the value, best matches first
+        scores = booking_data['Name'].map(dict(name_index.search(value)))
+        matched = scores[scores.notna()].sort_values(ascending=False, kind='stable')
+        return booking_data.loc[matched.index]
+    elif criteria == 'No of Adults':
+        return booking_data[booking_data['Adult'] == int(value)]
+    elif criteria == 'Travel Date':
+        return booking_data[booking_data['Travel Date'] == date_value]
+    raise ValueError(f"Unknown search criteria: {criteria}")
+
 class SearchFunctions:
     def __init__(self, root, booking_data, tree, revert_filter_enabled, search_menu):
         self.root = root
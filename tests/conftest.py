@@ -0,0 +1,54 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class StubTree:
+    # Just enough of ttk.Treeview for TreeviewSync: item values, attached children in order and a call log
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.values = {}
+        self.children = []
+        self.calls = []
+        self.ids = itertools.count(1)
+
+    def __getitem__(self, option):
+        assert option == 'columns'
+        return self.columns
+
+    def insert(self, parent, index, values=(), tags=()):
+        assert (parent, index) == ('', 'end')
+        item_id = f'I{next(self.ids):03d}'
+        self.values[item_id] = tuple(values)
+        self.children.append(item_id)
+        self.calls.append(('insert', item_id))
+        return item_id
+
+    def item(self, item_id, values=None):
+        self.values[item_id] = tuple(values)
+        self.calls.append(('item', item_id))
+
+    def delete(self, *item_ids):
+        for item_id in item_ids:
+            del self.values[item_id]
+        self.children = [item_id for item_id in self.children if item_id not in item_ids]
+        self.calls.append(('delete',) + item_ids)
+
+    def set_children(self, parent, *item_ids):
+        assert parent == '' and all(item_id in self.values for item_id in item_ids)
+        self.children = list(item_ids)
+        self.calls.append(('set_children', len(item_ids)))
+
+    def get_children(self, parent=''):
+        return tuple(self.children)
+
+    def shown(self):
+        return [self.values[item_id] for item_id in self.children]
+
+@pytest.fixture
+def stub_tree():
+    return StubTree(['Count', 'Booking Ref', 'Name', 'Adult'])
@@ -0,0 +1,87 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from analytics import BookingAnalytics
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    yield conn
+    conn.close()
+
+def bookings():
+    return pd.DataFrame({
+        'Booking Date': ['01/01/2024 10:00', '01/01/2024 12:30', '02/01/2024 09:00'],
+        'Travel Date': ['10/02/2024', '10/02/2024', '11/02/2024'],
+        'Product': ['Desert Safari', 'Dhow Cruise', 'Desert Safari'],
+        'Country': ['DE', None, 'FR'],
+        'Adult': [2.0, 1.0, None],
+        'GYG Price': [200.0, 80.0, 150.0],
+        'Net Price': [150.0, 60.0, 100.0],
+    })
+
+def test_rebuild_aggregates_every_dimension(conn):
+    analytics = BookingAnalytics(conn)
+    analytics.rebuild(bookings())
+
+    assert analytics.aggregates['product'] == {'Desert Safari': [2, 2.0, 350.0, 250.0], 'Dhow Cruise': [1, 1.0, 80.0, 60.0]}
+    assert analytics.aggregates['booking_day'] == {'01/01/2024': [2, 3.0, 280.0, 210.0], '02/01/2024': [1, 0.0, 150.0, 100.0]}
+    assert analytics.aggregates['country']['Unknown'] == [1, 1.0, 80.0, 60.0]
+    assert analytics.summary() == {'Bookings': 3, 'Adults': 3.0, 'GYG Price': 430.0, 'Net Price': 310.0, 'Margin': 120.0}
+
+def test_add_then_remove_round_trips_to_empty(conn):
+    analytics = BookingAnalytics(conn)
+    analytics.add_rows(bookings())
+    analytics.remove_rows(bookings())
+
+    assert analytics.aggregates == {dimension: {} for dimension in analytics.aggregates}
+
+def test_incremental_updates_match_a_rebuild(conn):
+    frame = bookings()
+    incremental = BookingAnalytics(conn)
+    incremental.add_rows(frame.iloc[:2])
+    incremental.add_rows(frame.iloc[2:])
+    edited = frame.iloc[[0]].assign(Product='Dhow Cruise', Adult=4.0)
+    incremental.update_rows(frame.iloc[[0]], edited)
+
+    rebuilt = BookingAnalytics(conn)
+    rebuilt.rebuild(pd.concat([edited, frame.iloc[1:]]))
+    assert incremental.aggregates == rebuilt.aggregates
+
+def test_save_and_load_round_trip(conn):
+    analytics = BookingAnalytics(conn)
+    analytics.rebuild(bookings())
+    analytics.save(version=7)
+    conn.commit()
+
+    loaded = BookingAnalytics(conn)
+    assert loaded.load(version=7, expected_rows=3)
+    assert loaded.aggregates == analytics.aggregates
+
+def test_save_writes_removed_keys_as_deletes(conn):
+    analytics = BookingAnalytics(conn)
+    analytics.rebuild(bookings())
+    analytics.save(version=1)
+    analytics.remove_rows(bookings().iloc[[1]])
+    analytics.save(version=2)
+
+    assert conn.execute('SELECT Key FROM analytics_product;').fetchall() == [('Desert Safari',)]
+
+def test_load_rejects_aggregates_of_another_version_or_size(conn):
+    analytics = BookingAnalytics(conn)
+    analytics.rebuild(bookings())
+    analytics.save(version=3)
+
+    assert not BookingAnalytics(conn).load(version=4, expected_rows=3)
+    assert not BookingAnalytics(conn).load(version=3, expected_rows=2)
+    assert not BookingAnalytics(sqlite3.connect(':memory:')).load(version=0, expected_rows=0)
+
+def test_table_orders_days_by_date_and_products_by_bookings(conn):
+    analytics = BookingAnalytics(conn)
+    analytics.rebuild(bookings().iloc[[2, 0, 1]])
+
+    assert [row[0] for row in analytics.table('travel_day')] == ['10/02/2024', '11/02/2024']
+    assert analytics.table('product')[0][:2] == ('Desert Safari', 2)
+    assert analytics.table('product')[0][-1] == 100.0
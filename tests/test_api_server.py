@@ -0,0 +1,162 @@
+import json
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import api_server
+
+TOKEN = 't'
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'booking_data.db')
+    conn = sqlite3.connect(path)
+    pd.DataFrame({
+        'Count': range(1, 1201),
+        'Travel Date': ['01/02/2030'] * 1200,
+        'Booking Ref': [f'GYG{i}' for i in range(1, 1201)],
+        'Name': ['Mohamed Ali' if i % 2 else 'Jon Doe' for i in range(1, 1201)],
+        'Email': ['customer@example.com'] * 1199 + [None],
+        'Adult': [2.0] * 1200,
+    }).to_sql('bookings', conn, index=False)
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def server(db_path, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(api_server, 'schedule_mail', lambda *args, **kwargs: scheduled.append((args, kwargs)))
+
+    server = api_server.create_server(db_path=db_path, port=0, token=TOKEN)
+    server.scheduled = scheduled
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    yield server
+    api_server.stop_server(server)
+
+def request(server, path, data=None, headers=None, method=None):
+    url = f'http://127.0.0.1:{server.server_address[1]}{path}'
+    req = urllib.request.Request(url, data=data, headers=headers or {}, method=method)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def post_mail(server, payload, content_type='application/json', token=TOKEN):
+    headers = {'Content-Type': content_type}
+    if token is not None:
+        headers['Authorization'] = f'Bearer {token}'
+    return request(server, '/mails', json.dumps(payload).encode(), headers, 'POST')
+
+def bump_version(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('UPDATE store_meta SET Version = Version + 1;')
+    conn.commit()
+    conn.close()
+
+#===================================================LISTING=======================================================#
+
+def test_list_bookings_pages_in_saved_order(server):
+    status, _, body = request(server, '/bookings?page=2&page_size=3')
+    payload = json.loads(body)
+
+    assert status == 200
+    assert (payload['page'], payload['page_size'], payload['total']) == (2, 3, 1200)
+    assert [booking['Booking Ref'] for booking in payload['bookings']] == ['GYG4', 'GYG5', 'GYG6']
+
+def test_etag_answers_304_until_the_version_changes(server, db_path):
+    _, headers, _ = request(server, '/bookings?page=1&page_size=10')
+    etag = headers['ETag']
+
+    status, _, body = request(server, '/bookings?page=1&page_size=10', headers={'If-None-Match': etag})
+    assert (status, body) == (304, b'')
+
+    bump_version(db_path)
+    status, headers, _ = request(server, '/bookings?page=1&page_size=10', headers={'If-None-Match': etag})
+    assert status == 200
+    assert headers['ETag'] != etag
+
+@pytest.mark.parametrize('query', ['page=0', 'page_size=0', 'page=-1', 'page=x'])
+def test_invalid_pages_are_rejected(server, query):
+    status, _, body = request(server, f'/bookings?{query}')
+    assert status == 400
+    assert 'error' in json.loads(body)
+
+def test_page_size_is_capped(server):
+    _, _, body = request(server, f'/bookings?page_size={api_server.MAX_PAGE_SIZE * 5}')
+    payload = json.loads(body)
+
+    assert payload['page_size'] == api_server.MAX_PAGE_SIZE
+    assert len(payload['bookings']) == api_server.MAX_PAGE_SIZE
+
+#===================================================SEARCH========================================================#
+
+def test_search_streams_chunked_json(server):
+    status, headers, body = request(server, '/bookings/search?criteria=Customer%20Name&value=mohamed')
+    payload = json.loads(body)
+
+    assert status == 200
+    assert headers['Transfer-Encoding'] == 'chunked'
+    assert payload['total'] == 600 > api_server.STREAM_BATCH_SIZE
+    assert len(payload['bookings']) == 600
+    assert {booking['Name'] for booking in payload['bookings']} == {'Mohamed Ali'}
+
+def test_search_etag_changes_with_the_version(server, db_path):
+    path = '/bookings/search?criteria=Customer%20Name%20(Fuzzy)&value=Muhammad'
+    _, headers, body = request(server, path)
+    assert json.loads(body)['bookings'][0]['Name'] == 'Mohamed Ali'
+
+    assert request(server, path, headers={'If-None-Match': headers['ETag']})[0] == 304
+    bump_version(db_path)
+    assert request(server, path, headers={'If-None-Match': headers['ETag']})[0] == 200
+
+@pytest.mark.parametrize('query', ['criteria=Unknown&value=1', 'criteria=No%20of%20Adults&value=two'])
+def test_invalid_searches_are_rejected(server, query):
+    status, _, body = request(server, f'/bookings/search?{query}')
+    assert status == 400
+    assert 'error' in json.loads(body)
+
+def test_get_booking(server):
+    status, _, body = request(server, '/bookings/GYG7')
+    assert status == 200
+    assert json.loads(body)['Name'] == 'Mohamed Ali'
+
+    assert request(server, '/bookings/NOPE')[0] == 404
+
+#====================================================MAILS========================================================#
+
+MAIL = {'booking_ref': 'GYG1', 'subject': 'Pickup time', 'body': 'See you at 9', 'send_at': '2099-01-01T09:00'}
+
+def test_mail_is_scheduled_for_the_booking_customer(server):
+    status, _, body = post_mail(server, MAIL)
+
+    assert status == 202
+    assert json.loads(body)['email'] == 'customer@example.com'
+    (args, kwargs), = server.scheduled
+    assert args[1:] == ('customer@example.com', 'Pickup time', 'See you at 9')
+    assert kwargs == {}
+
+@pytest.mark.parametrize('token', [None, 'wrong'])
+def test_mail_requires_the_token(server, token):
+    assert post_mail(server, MAIL, token=token)[0] == 401
+    assert server.scheduled == []
+
+def test_mail_requires_json(server):
+    assert post_mail(server, MAIL, content_type='text/plain')[0] == 415
+    assert server.scheduled == []
+
+@pytest.mark.parametrize('extra', [{'email': 'someone@elsewhere.com'}, {'attachments': ['credentials.py']}])
+def test_mail_rejects_other_recipients_and_attachments(server, extra):
+    assert post_mail(server, {**MAIL, **extra})[0] == 400
+    assert server.scheduled == []
+
+@pytest.mark.parametrize('payload', [{**MAIL, 'booking_ref': 'NOPE'}, {**MAIL, 'booking_ref': 'GYG1200'}, {**MAIL, 'subject': ''},
+                                     {**MAIL, 'send_at': 'tomorrow'}, [MAIL]])
+def test_invalid_mails_are_rejected(server, payload):
+    assert post_mail(server, payload)[0] == 400
+    assert server.scheduled == []
@@ -0,0 +1,98 @@
+import datetime
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from archive import BookingArchive
+
+@pytest.fixture
+def archive(tmp_path):
+    return BookingArchive(str(tmp_path / 'archive'), horizon_days=30)
+
+def travel_date(days_ago):
+    return (datetime.date.today() - datetime.timedelta(days=days_ago)).strftime('%d/%m/%Y')
+
+def bookings():
+    return pd.DataFrame({
+        'Count': [1, 2, 3, 4],
+        'Travel Date': ['15/01/2020', '20/01/2020', '03/02/2020', travel_date(0)],
+        'Booking Ref': ['GYG1', 'GYG2', 'GYG3', 'GYG4'],
+        'Name': ['Anna Berg', 'Carl Berg', 'Eva Lind', 'Ola Lind'],
+        'Adult': [2.0, None, 1.0, 2.0],
+    })
+
+def test_old_bookings_are_routed_to_their_travel_month(archive):
+    kept, archived = archive.archive(bookings())
+
+    assert list(kept['Booking Ref']) == ['GYG4']
+    assert list(archived['Booking Ref']) == ['GYG1', 'GYG2', 'GYG3']
+    assert [os.path.basename(path) for path in archive.partitions()] == ['bookings_2020_01.db', 'bookings_2020_02.db']
+    assert archive.row_count() == 3
+
+def test_nothing_is_archived_within_the_horizon(archive):
+    kept, archived = archive.archive(bookings(), horizon_days=100000)
+
+    assert len(kept) == 4 and archived.empty
+    assert archive.partitions() == []
+
+def test_archiving_again_replaces_earlier_copies(archive):
+    archive.archive(bookings())
+    archive.archive(bookings().assign(Name='Renamed'))
+
+    assert archive.row_count() == 3
+    assert archive.lookup('GYG1')['Name'] == 'Renamed'
+    assert archive.archived_refs(bookings()) == {'GYG1', 'GYG2', 'GYG3'}
+
+def test_archived_refs_only_reads_past_months_of_the_given_bookings(archive, monkeypatch):
+    archive.archive(bookings())
+    queried = []
+    query = archive._query
+    monkeypatch.setattr(archive, '_query', lambda path, *args: queried.append(os.path.basename(path)) or query(path, *args))
+
+    imported = pd.DataFrame({'Travel Date': ['20/01/2020', '21/01/2020', '05/03/2020', travel_date(0)], 'Booking Ref': ['GYG2', 'GYG9', 'GYG3', 'GYG1']})
+    assert archive.archived_refs(imported, batch_size=1) == {'GYG2'}
+    assert queried == ['bookings_2020_01.db', 'bookings_2020_01.db']
+
+def test_unarchive_takes_bookings_back_out_of_their_partitions(archive):
+    kept, archived = archive.archive(bookings())
+    archive.unarchive(archived[archived['Booking Ref'] != 'GYG3'])
+
+    assert archive.row_count() == 1
+    assert archive.lookup('GYG1') is None and archive.lookup('GYG3')['Name'] == 'Eva Lind'
+
+def test_failed_archive_leaves_no_partial_months(archive, monkeypatch):
+    write = archive._write_partition
+    calls = []
+    def fail_second(conn, partition):
+        calls.append(partition)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError('disk I/O error')
+        write(conn, partition)
+    monkeypatch.setattr(archive, '_write_partition', fail_second)
+
+    with pytest.raises(sqlite3.OperationalError):
+        archive.archive(bookings())
+    assert archive.row_count() == 0
+    assert [os.path.basename(path) for path in archive.partitions()] == ['bookings_2020_01.db']
+
+def test_search_by_travel_date_only_reads_that_month(archive, monkeypatch):
+    archive.archive(bookings())
+    queried = []
+    query = archive._query
+    monkeypatch.setattr(archive, '_query', lambda path, *args: queried.append(os.path.basename(path)) or query(path, *args))
+
+    result = archive.search('Travel Date', '', '03/02/2020')
+    assert list(result['Booking Ref']) == ['GYG3']
+    assert queried == ['bookings_2020_02.db']
+
+def test_search_and_lookup_across_partitions(archive):
+    archive.archive(bookings())
+
+    assert sorted(archive.search('Customer Name', 'berg', None)['Booking Ref']) == ['GYG1', 'GYG2']
+    assert list(archive.search('No of Adults', '1', None)['Booking Ref']) == ['GYG3']
+    assert pd.isna(archive.lookup('GYG2')['Adult'])
+    assert archive.lookup('GYG4') is None
+    assert archive.search('Travel Date', '', 'not a date').empty
+    assert len(archive.load_all()) == 3
@@ -0,0 +1,86 @@
+import sqlite3
+
+import pandas as pd
+
+from archive import BookingArchive
+from booking_repository import BookingRepository
+
+class CountingArchive:
+    # Archive stand-in holding records per ref and counting the lookups that reach it
+    def __init__(self, records):
+        self.records = records
+        self.lookups = 0
+
+    def lookup(self, booking_ref, occurrence=0):
+        self.lookups += 1
+        records = self.records.get(booking_ref, [])
+        return records[occurrence] if occurrence < len(records) else None
+
+def test_underscore_and_space_column_layouts_autofill_the_same(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'booking_data.db'))
+    pd.DataFrame({'Booking_Ref': ['GYG1'], 'Name': ['Anna Berg'], 'Phone_No': ['+4912'], 'Travel_Date': ['01/02/2024'], 'Email': [None]}) \
+        .to_sql('bookings', conn, index=False)
+    underscore = pd.read_sql_query('SELECT * FROM bookings;', conn)
+    spaced = underscore.rename(columns=lambda column: column.replace('_', ' '))
+
+    for frame in (underscore, spaced):
+        repository = BookingRepository()
+        repository.warm(frame)
+        assert repository.get(' GYG1 ') == {'Booking Ref': 'GYG1', 'Name': 'Anna Berg', 'Phone No': '+4912', 'Travel Date': '01/02/2024', 'Email': ''}
+
+def test_repeated_refs_are_resolved_by_occurrence():
+    repository = BookingRepository(archive=CountingArchive({'GYG1': [{'Booking_Ref': 'GYG1', 'Name': 'Archived', 'Adult': float('nan')}]}))
+    repository.warm(pd.DataFrame({'Booking Ref': ['GYG1', 'GYG2', 'GYG1'], 'Name': ['First', 'Other', 'Second']}))
+
+    assert repository.get('GYG1')['Name'] == 'First'
+    assert repository.get('GYG1', 1)['Name'] == 'Second'
+
+    # Occurrences past the loaded rows continue in the archive
+    assert repository.get('GYG1', 2) == {'Booking Ref': 'GYG1', 'Name': 'Archived', 'Adult': ''}
+    assert repository.get('GYG1', 3) is None
+
+def test_archived_rows_sharing_a_ref_are_told_apart(tmp_path):
+    archive = BookingArchive(str(tmp_path / 'archive'))
+    archive.archive(pd.DataFrame({'Travel Date': ['01/01/2020', '02/01/2020'], 'Booking Ref': ['GYG1', 'GYG1'], 'Name': ['First', 'Second']}))
+    repository = BookingRepository(archive=archive)
+    repository.warm(pd.DataFrame(columns=['Booking Ref', 'Name']))
+
+    assert repository.get('GYG1', 0)['Name'] == 'First'
+    assert repository.get('GYG1', 1)['Name'] == 'Second'
+
+def test_invalidate_then_warm_only_serves_the_new_bookings():
+    archive = CountingArchive({})
+    repository = BookingRepository(archive=archive)
+    repository.warm(pd.DataFrame({'Booking Ref': ['OLD'], 'Name': ['Old Import']}))
+    assert repository.get('OLD')['Name'] == 'Old Import'
+
+    repository.invalidate()
+    repository.warm(pd.DataFrame({'Booking Ref': ['NEW'], 'Name': ['New Import']}))
+    assert repository.get('OLD') is None
+    assert repository.get('NEW')['Name'] == 'New Import'
+
+def test_missing_refs_are_rejected_without_a_lookup():
+    archive = CountingArchive({})
+    repository = BookingRepository(archive=archive)
+
+    assert repository.get(None) is None
+    assert repository.get('   ') is None
+    assert archive.lookups == 0
+
+def test_archive_lookups_are_cached_in_a_bounded_lru():
+    archive = CountingArchive({f'GYG{i}': [{'Booking Ref': f'GYG{i}'}] for i in range(4)})
+    repository = BookingRepository(cache_size=2, archive=archive)
+
+    repository.get('GYG0')
+    repository.get('GYG1')
+    repository.get('GYG0')
+    assert archive.lookups == 2
+
+    repository.get('GYG2')
+    assert list(repository.cache) == [('GYG0', 0), ('GYG2', 0)]
+
+    repository.get('GYG1')
+    assert archive.lookups == 4
+
+    repository.invalidate()
+    assert len(repository.cache) == 0
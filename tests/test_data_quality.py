@@ -0,0 +1,83 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_quality import DataQualityScanner, source_presence
+
+@pytest.fixture
+def scanner():
+    conn = sqlite3.connect(':memory:')
+    yield DataQualityScanner(conn)
+    conn.close()
+
+def booking(count, ref, name='Anna Berg', email='anna@example.com', **columns):
+    row = {'Count': count, 'Booking Date': '01/01/2024 10:00', 'Travel Date': '10/02/2024', 'Product': 'Desert Safari',
+           'Booking Ref': ref, 'Name': name, 'Country': 'DE', 'Email': email, 'Phone No': '+4912345',
+           'Adult': 2.0, 'GYG Price': 200.0, 'Net Price': 150.0}
+    row.update(columns)
+    return row
+
+def issues_by_count(issues):
+    return {(count, issue) for count, issue in zip(issues['Count'], issues['Issue'])}
+
+def test_clean_bookings_have_no_issues(scanner):
+    frame = pd.DataFrame([booking(1, 'GYG1'), booking(2, 'GYG2', name='Carl Berg')])
+    assert scanner.scan(frame).empty
+
+def test_duplicates(scanner):
+    frame = pd.DataFrame([
+        booking(1, 'GYG1'),
+        booking(2, 'GYG1'),                          # exact copy apart from Count
+        booking(3, 'GYG3', name='Carl Berg'),
+        booking(4, 'GYG3', name='Carl Berg', Adult=3.0),  # same ref, different booking
+        booking(5, 'GYG5', name='Eva  Lind'),
+        booking(6, 'GYG6', name='eva lind'),         # same customer, date and product under another ref
+    ])
+    found = issues_by_count(scanner.scan(frame))
+
+    assert (2, 'Exact Duplicate') in found
+    assert {(3, 'Duplicate Booking Ref'), (4, 'Duplicate Booking Ref')} <= found
+    assert {(5, 'Possible Duplicate'), (6, 'Possible Duplicate')} <= found
+    assert (1, 'Exact Duplicate') not in found
+
+def test_invalid_values(scanner):
+    frame = pd.DataFrame([
+        booking(1, 'GYG1', email='not-an-email'),
+        booking(2, 'GYG2', name='B', **{'Net Price': 250.0}),
+        booking(3, 'GYG3', name='C', Adult=1.5),
+        booking(4, None, name='D', **{'GYG Price': -1.0}),
+    ])
+    found = issues_by_count(scanner.scan(frame))
+
+    assert {(1, 'Invalid Email'), (2, 'Net Price Above GYG Price'), (3, 'Invalid Adults'),
+            (4, 'Missing Booking Ref'), (4, 'Negative Price')} <= found
+
+def test_unparseable_is_told_apart_from_missing():
+    source = pd.DataFrame({'Purchase Date (local time)': ['01/01/2024 10:00', 'yesterday', None], 'Date': ['10/02/2024'] * 3,
+                           'Adult': [2, 2, 2], 'Price': ['200 AED'] * 3, 'Net Price': ['150 AED'] * 3})
+    presence = source_presence(source)
+    frame = pd.DataFrame([booking(1, 'GYG1'), booking(2, 'GYG2', name='B'), booking(3, 'GYG3', name='C')])
+    frame.loc[[1, 2], 'Booking Date'] = np.nan
+
+    found = issues_by_count(DataQualityScanner(sqlite3.connect(':memory:')).scan(frame, presence))
+    assert (2, 'Unparseable Booking Date') in found
+    assert (3, 'Missing Booking Date') in found
+
+def test_float_typed_name_and_email_columns_are_scanned(scanner):
+    frame = pd.DataFrame([booking(1, 'GYG1'), booking(2, 'GYG2')])
+    frame['Name'] = np.nan
+    frame['Email'] = np.nan
+
+    found = issues_by_count(scanner.scan(frame))
+    assert {(1, 'Missing Email'), (2, 'Missing Email')} <= found
+
+def test_save_and_load_round_trip(scanner):
+    scanner.scan(pd.DataFrame([booking(1, 'GYG1', email=None)]))
+    scanner.save()
+    scanner.db_connection.commit()
+
+    loaded = DataQualityScanner(scanner.db_connection).load()
+    assert list(loaded['Issue']) == ['Missing Email']
+    assert scanner.summary() == {'Missing Email': 1}
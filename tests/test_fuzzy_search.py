@@ -0,0 +1,77 @@
+import pandas as pd
+
+from fuzzy_search import NameIndex, normalize_name, phonetic_key, trigrams
+from search import filter_bookings
+
+def test_normalize_name_folds_case_accents_and_punctuation():
+    assert normalize_name("  José  O'Neil-Smith ") == 'jose o neil smith'
+    assert normalize_name('Straße') == 'strasse'
+
+def test_normalize_name_keeps_non_latin_letters():
+    assert normalize_name('محمد علي') == 'محمد علي'
+    assert normalize_name('Иван Петров!') == 'иван петров'
+    assert normalize_name('王小明') == '王小明'
+
+def test_phonetic_key_is_soundex():
+    assert phonetic_key('mohamed') == phonetic_key('muhammad') == 'm53'
+    assert phonetic_key('robert') == phonetic_key('rupert') == 'r163'
+    assert phonetic_key('ashcraft') == 'a261'
+    assert phonetic_key('محمد') == ''
+
+def test_trigrams_are_padded():
+    assert trigrams('ab') == {'  a', ' ab', 'ab '}
+
+def test_search_ranks_exact_then_similar_spellings():
+    index = NameIndex()
+    index.add_names(['Mohamed Ali', 'Muhammad Aly', 'John Smith', 'Mohammed Ali'])
+
+    results = index.search('Mohamed Ali')
+    assert results[0] == ('Mohamed Ali', 1.0)
+    assert {name for name, _ in results} == {'Mohamed Ali', 'Mohammed Ali', 'Muhammad Aly'}
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+def test_search_finds_non_latin_names():
+    index = NameIndex()
+    index.add_names(['محمد علي', 'Иван Петров', 'Mohamed Ali'])
+
+    assert index.search('محمد')[0][0] == 'محمد علي'
+    assert index.search('иван')[0][0] == 'Иван Петров'
+
+def test_every_spelling_of_a_normalized_name_is_returned():
+    index = NameIndex()
+    index.add_names(['Jose Nunez', 'José Núñez', 'Jose Nunez'])
+
+    assert index.counts == {'jose nunez': 3}
+    assert sorted(name for name, _ in index.search('jose nunez')) == ['Jose Nunez', 'José Núñez']
+
+def test_remove_names_drops_unused_names_from_the_postings():
+    index = NameIndex()
+    index.add_names(['Anna Berg', 'Anna Berg', 'Carl Berg'])
+    index.remove_names(['Anna Berg'])
+    assert index.counts['anna berg'] == 1
+
+    index.remove_names(['Anna Berg', 'Carl Berg'])
+    assert index.counts == {} and index.postings == {} and index.phonetics == {}
+    assert index.tokens == {} and index.sound_tokens == {}
+
+def test_rare_spelling_survives_a_common_sound_with_only_common_trigrams():
+    # Every trigram of the query is over max_postings and the sound matches more names than max_candidates
+    names = ['%s %s' % (first, last) for first in ['Muhammed', 'Mohammad', 'Mohamed'] for last in ['Berg', 'Lind', 'Holm', 'Dahl', 'Sten', 'Falk']]
+    index = NameIndex(max_postings=3, max_candidates=5)
+    index.add_names(names + ['Muhammad Ali'])
+
+    assert index.search('Muhamad')[0][0] == 'Muhammad Ali'
+
+def test_filter_bookings_orders_fuzzy_matches_by_score():
+    bookings = pd.DataFrame({'Name': ['John Smith', 'Muhammad Aly', 'Mohamed Ali', None]})
+    index = NameIndex()
+    index.add_names(bookings['Name'])
+
+    result = filter_bookings(bookings, 'Customer Name (Fuzzy)', 'Mohamed Ali', name_index=index)
+    assert list(result['Name']) == ['Mohamed Ali', 'Muhammad Aly']
+
+def test_filter_bookings_substring_search_is_literal():
+    bookings = pd.DataFrame({'Name': ['Ali (Jr)', 'Alison'], 'Booking Ref': ['GYG1', 'GYG2']})
+
+    assert list(filter_bookings(bookings, 'Customer Name', '(jr')['Name']) == ['Ali (Jr)']
+    assert list(filter_bookings(bookings, 'Booking Ref', 'gyg2')['Name']) == ['Alison']
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from instrumentation import NULL_SPAN, Instrumentation
+
+@pytest.fixture
+def instrumentation():
+    instrumentation = Instrumentation(window=100)
+    instrumentation.enabled = True
+    return instrumentation
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = Instrumentation()
+
+    @instrumentation.timed('work', rows=lambda value: value)
+    def work(value):
+        return value * 2
+
+    assert work(21) == 42
+    assert instrumentation.span('block') is NULL_SPAN
+    with instrumentation.span('block'):
+        pass
+    assert instrumentation.stats() == [] and list(instrumentation.spans) == []
+
+def test_timed_records_rows_and_errors(instrumentation):
+    @instrumentation.timed('work', rows=lambda values: len(values))
+    def work(values):
+        if not values:
+            raise ValueError("empty")
+        return sum(values)
+
+    assert work([1, 2, 3]) == 6
+    with pytest.raises(ValueError):
+        work([])
+
+    spans = list(instrumentation.spans)
+    assert [(span['name'], span['rows'], span['error']) for span in spans] == [('work', 3, False), ('work', None, True)]
+
+def test_span_rows_can_be_set_inside_the_block(instrumentation):
+    with instrumentation.span('read_excel') as span:
+        span.rows = 12
+
+    assert instrumentation.spans[-1]['rows'] == 12
+
+def test_stats_percentiles_and_max(instrumentation):
+    for duration in range(1, 101):
+        instrumentation.record('query', duration / 1000, rows=duration)
+    instrumentation.record('render', 0.005)
+
+    stats = {row[0]: row[1:] for row in instrumentation.stats()}
+    count, p50, p95, maximum, rows = stats['query']
+    assert count == 100
+    assert p50 == pytest.approx(51.0)
+    assert p95 == pytest.approx(95.0)
+    assert maximum == pytest.approx(100.0)
+    assert rows == 100
+    assert stats['render'][:4] == (1, pytest.approx(5.0), pytest.approx(5.0), pytest.approx(5.0))
+
+def test_stats_only_cover_the_rolling_window():
+    instrumentation = Instrumentation(window=3)
+    for duration in (10.0, 0.001, 0.002, 0.003):
+        instrumentation.record('query', duration)
+
+    assert instrumentation.stats()[0][4] == pytest.approx(3.0)
+
+def test_export_jsonl_overwrites_the_file(instrumentation, tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    instrumentation.record('old', 0.001)
+    assert instrumentation.export_jsonl(str(path)) == 1
+
+    instrumentation.reset()
+    instrumentation.record('new', 0.002, rows=5)
+    instrumentation.record('new', 0.003, rows=6)
+    assert instrumentation.export_jsonl(str(path)) == 2
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(span['name'], span['rows']) for span in spans] == [('new', 5), ('new', 6)]
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from treeview_sync import TreeviewSync
+
+def bookings(refs, names=None, adults=None):
+    return pd.DataFrame({
+        'Count': range(1, len(refs) + 1),
+        'Booking Ref': refs,
+        'Name': names or [f'Name {ref}' for ref in refs],
+        'Adult': adults or [2.0] * len(refs),
+    })
+
+def test_initial_sync_inserts_every_row_in_order(stub_tree):
+    data = bookings(['A', 'B', 'C'], adults=[1.0, np.nan, 3.0])
+    TreeviewSync(stub_tree).sync(data)
+
+    assert stub_tree.shown() == [(1, 'A', 'Name A', 1), (2, 'B', 'Name B', ''), (3, 'C', 'Name C', 3)]
+
+def test_filter_and_revert_reuse_items(stub_tree):
+    data = bookings(['A', 'B', 'C', 'D'])
+    sync = TreeviewSync(stub_tree)
+    sync.sync(data)
+    items = list(stub_tree.children)
+    stub_tree.calls.clear()
+
+    sync.sync(data[data['Booking Ref'].isin(['D', 'B'])], data)
+    assert stub_tree.children == [items[1], items[3]]
+
+    sync.sync(data)
+    assert stub_tree.children == items
+    assert [call[0] for call in stub_tree.calls] == ['set_children', 'set_children']
+
+def test_unchanged_sync_makes_no_tree_calls(stub_tree):
+    data = bookings(['A', 'B'])
+    sync = TreeviewSync(stub_tree)
+    sync.sync(data)
+    stub_tree.calls.clear()
+
+    sync.sync(data)
+    assert stub_tree.calls == []
+
+def test_ranked_result_is_shown_in_result_order(stub_tree):
+    data = bookings(['A', 'B', 'C'])
+    sync = TreeviewSync(stub_tree)
+    sync.sync(data)
+
+    sync.sync(data.loc[[2, 0]], data)
+    assert [values[1] for values in stub_tree.shown()] == ['C', 'A']
+
+def test_new_booking_set_updates_edits_and_deletes_removed_rows(stub_tree):
+    sync = TreeviewSync(stub_tree)
+    sync.sync(bookings(['A', 'B', 'C']))
+    item_a = stub_tree.children[0]
+
+    sync.sync(bookings(['A', 'C', 'E'], names=['Renamed', 'Name C', 'Name E']))
+
+    assert [values[1:3] for values in stub_tree.shown()] == [('A', 'Renamed'), ('C', 'Name C'), ('E', 'Name E')]
+    assert stub_tree.children[0] == item_a
+    assert len(stub_tree.values) == 3
+    assert ('item', item_a) in stub_tree.calls
+
+def test_repeated_refs_get_their_own_items(stub_tree):
+    data = bookings(['A', 'A', 'B'], names=['First', 'Second', 'Other'])
+    sync = TreeviewSync(stub_tree)
+    sync.sync(data)
+
+    assert [sync.key_for_item(item_id) for item_id in stub_tree.children] == [('A', 0), ('A', 1), ('B', 0)]
+
+    # A filtered row keeps the occurrence it has in the full set
+    sync.sync(data[data['Name'] == 'Second'], data)
+    assert sync.key_for_item(stub_tree.children[0]) == ('A', 1)
+
+def test_reverting_from_an_archive_search_reuses_the_cached_bookings(stub_tree):
+    data = bookings(['A', 'B'])
+    sync = TreeviewSync(stub_tree)
+    sync.sync(data)
+
+    archived = bookings(['Z'])
+    archived.index = pd.RangeIndex(len(data), len(data) + 1)
+    sync.sync(pd.concat([data.iloc[:1], archived]), pd.concat([data, archived]))
+    assert [values[1] for values in stub_tree.shown()] == ['A', 'Z']
+
+    stub_tree.calls.clear()
+    sync.sync(data)
+    assert [values[1] for values in stub_tree.shown()] == ['A', 'B']
+    assert [call[0] for call in stub_tree.calls] == ['set_children']
+
+def test_clear_removes_attached_and_detached_items(stub_tree):
+    data = bookings(['A', 'B'])
+    sync = TreeviewSync(stub_tree)
+    sync.sync(data)
+    sync.sync(data.iloc[:1], data)
+
+    sync.clear()
+    assert stub_tree.values == {}
+    assert sync.key_for_item('I001') is None
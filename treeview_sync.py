@@ -0,0 +1,146 @@
+import numbers
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+class TreeviewSync:
+    def __init__(self, tree, key_column='Booking Ref', cached_frames=2):
+        self.tree = tree
+        self.key_column = key_column
+        self.cached_frames = cached_frames
+
+        # Booking key -> Treeview item ID, and the reverse lookup for selections
+        self.item_ids = {}
+        self.keys = {}
+
+        # Values currently shown by every item, so unchanged rows are never touched
+        self.item_values = {}
+
+        # Item IDs currently attached, in display order
+        self.shown = []
+
+        # Keys, formatted values and item IDs per row of the recent full booking sets, so filters and reverts only index into them
+        # Two are kept, so going back from a search that included the archive doesn't recompute the bookings
+        self.frames = OrderedDict()
+        self.frame = None
+        self.frame_keys = None
+        self.frame_values = None
+        self.frame_items = None
+
+    def sync(self, data, all_data=None):
+        # Reconcile the Treeview with data, all_data is the full booking set data was filtered from
+        if all_data is None:
+            all_data = data
+        if all_data is not self.frame:
+            self._use_frame(all_data)
+
+        # Rows of data by position in all_data, a filter result is always a subset of it
+        if data is all_data:
+            positions = np.arange(len(all_data))
+        else:
+            positions = all_data.index.get_indexer(data.index) if all_data.index.is_unique else np.array([-1])
+            if len(positions) and positions.min() < 0:
+                # Not taken from all_data, so its rows get their own items
+                self._use_frame(data)
+                all_data, positions = data, np.arange(len(data))
+
+        # Only rows without an up to date item are visited, a revert or repeated filter skips straight to the reorder
+        items = self.frame_items
+        updated = False
+        for position in positions[pd.isna(items[positions])]:
+            key = self.frame_keys[position]
+            values = self.frame_values[position]
+            item_id = self.item_ids.get(key)
+            if item_id is None:
+                # New booking, created once and reused by every later filter
+                item_id = self.tree.insert('', 'end', values=values, tags=("style",))
+                self.item_ids[key] = item_id
+                self.keys[item_id] = key
+                self.item_values[item_id] = values
+                self.shown.append(item_id)
+            elif self.item_values[item_id] != values:
+                # Edited booking, only its values are updated
+                self.tree.item(item_id, values=values)
+                self.item_values[item_id] = values
+                updated = True
+            items[position] = item_id
+
+        # Other cached sets assumed the old values
+        if updated:
+            self._forget_other_frames()
+
+        # Detach and reattach in a single call, only if the shown order differs
+        desired = items[positions].tolist()
+        if desired != self.shown:
+            self.tree.set_children('', *desired)
+            self.shown = desired
+
+    def clear(self):
+        # Remove every item, attached or detached
+        if self.item_ids:
+            self.tree.delete(*self.item_ids.values())
+        self.item_ids = {}
+        self.keys = {}
+        self.item_values = {}
+        self.shown = []
+        self.frames.clear()
+        self.frame = None
+
+    def key_for_item(self, item_id):
+        # (Booking Ref, occurrence) of a Treeview item, the occurrence tells bookings sharing a ref apart
+        return self.keys.get(item_id)
+
+    def _use_frame(self, all_data):
+        # The cache holds on to every frame it keys by id, so an id can't be reused by another frame while cached
+        entry = self.frames.get(id(all_data))
+        if entry is None:
+            entry = self._load_frame(all_data)
+        self.frames.move_to_end(id(all_data))
+        self.frame, self.frame_keys, self.frame_values, self.frame_items = entry
+
+    def _load_frame(self, all_data):
+        # Keys and display values are computed once per booking set
+        entry = (all_data, self._keys(all_data), self._rows(all_data), np.full(len(all_data), None, dtype=object))
+
+        # Bookings that no longer exist are deleted
+        existing = set(entry[1])
+        deleted = [item_id for key, item_id in self.item_ids.items() if key not in existing]
+        if deleted:
+            self.tree.delete(*deleted)
+            for item_id in deleted:
+                del self.item_ids[self.keys.pop(item_id)]
+                del self.item_values[item_id]
+            deleted = set(deleted)
+            self.shown = [item_id for item_id in self.shown if item_id not in deleted]
+            self.frames.clear()
+
+        self.frames[id(all_data)] = entry
+        while len(self.frames) > self.cached_frames:
+            self.frames.popitem(last=False)
+        return entry
+
+    def _forget_other_frames(self):
+        for frame_id in [frame_id for frame_id in self.frames if frame_id != id(self.frame)]:
+            del self.frames[frame_id]
+
+    def _keys(self, data):
+        # Booking Ref plus its occurrence, so repeated refs still get their own item
+        if self.key_column in data.columns:
+            refs = data[self.key_column].astype(str).str.strip()
+        else:
+            refs = pd.Series(data.index.astype(str), index=data.index)
+        occurrences = refs.groupby(refs, sort=False).cumcount()
+        return list(zip(refs.tolist(), occurrences.tolist()))
+
+    def _rows(self, data):
+        # Display values column by column, missing columns and empty cells show as ""
+        columns = list(self.tree['columns'])
+        frame = data.reindex(columns=columns).astype(object)
+        frame = frame.where(frame.notna(), "")
+        values = [frame[col].tolist() for col in columns]
+
+        # Show 'Adult' as an integer without decimal points
+        if 'Adult' in columns:
+            adults = columns.index('Adult')
+            values[adults] = [int(value) if isinstance(value, numbers.Number) else value for value in values[adults]]
+        return list(zip(*values))